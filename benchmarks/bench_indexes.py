@@ -0,0 +1,91 @@
+"""Đo các truy vấn nóng trước và sau khi tạo index bằng DatabaseManager.ensure_schema.
+
+Chạy: python benchmarks/bench_indexes.py [số sự kiện] [số truy vấn]
+Cần MONGODB_URI trỏ tới một MongoDB có thể ghi; dữ liệu được ghi vào
+database riêng `calendar_bot_bench` và bị xóa khi kết thúc.
+
+Chưa có số liệu đo với MongoDB thật: mức cải thiện của các index ở đây chưa
+được kiểm chứng. MongoDB giả lập (mongomock) bỏ qua index nên không dùng được
+để so sánh trước/sau.
+"""
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import DatabaseManager
+
+BENCH_DB = 'calendar_bot_bench'
+USERS = 10_000
+
+async def seed(db, count):
+    for collection in ('events', 'user_settings', 'authorized_users', 'meta'):
+        await db.db[collection].drop()
+
+    docs = []
+    for i in range(count):
+        docs.append({
+            'event_id': f'event_{i}',
+            'title': f'Sự kiện {i}',
+            'datetime': f'2030-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:00',
+            'description': 'Không có mô tả',
+            'created_by': str(i % USERS)
+        })
+        if len(docs) == 10000:
+            await db.events.insert_many(docs, ordered=False)
+            docs = []
+    if docs:
+        await db.events.insert_many(docs, ordered=False)
+
+    await db.user_settings.insert_many(
+        [{'user_id': str(i), 'calendar_id': 'encrypted'} for i in range(USERS)], ordered=False
+    )
+    await db.authorized_users.insert_many(
+        [{'user_id': str(i), 'authorized': True} for i in range(0, USERS, 2)], ordered=False
+    )
+
+async def run_queries(db, count, rounds):
+    queries = {
+        'events.event_id': lambda: db.events.find_one({'event_id': f'event_{random.randrange(count)}'}),
+        'user_settings.user_id': lambda: db.user_settings.find_one({'user_id': str(random.randrange(USERS))}),
+        'authorized_users.user_id': lambda: db.authorized_users.find_one({'user_id': str(random.randrange(USERS))}),
+        'events theo created_by + datetime': lambda: db.events.find(
+            {'created_by': str(random.randrange(USERS)), 'datetime': {'$gte': '2030-06-01 00:00'}}
+        ).to_list(length=None),
+    }
+    for label, query in queries.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            await query()
+        elapsed = (time.perf_counter() - started) / rounds
+        print(f"  {label:<36} {elapsed * 1000:9.3f} ms/truy vấn")
+
+async def main(count, rounds):
+    db = DatabaseManager(db_name=BENCH_DB)
+    try:
+        await seed(db, count)
+        print(f"Không có index ({count} sự kiện, {USERS} user):")
+        await run_queries(db, count, rounds)
+
+        started = time.perf_counter()
+        await db.ensure_schema()
+        print(f"ensure_schema lần đầu: {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        await db.ensure_schema()
+        print(f"ensure_schema khi đã cập nhật: {(time.perf_counter() - started) * 1000:.2f} ms")
+
+        print("Có index:")
+        await run_queries(db, count, rounds)
+    finally:
+        await db.client.drop_database(BENCH_DB)
+        db.close()
+
+if __name__ == '__main__':
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    ))
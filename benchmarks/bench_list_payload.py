@@ -0,0 +1,91 @@
+"""So sánh dung lượng và thời gian parse của events.list: response đầy đủ và profile tối giản.
+
+Chạy: python benchmarks/bench_list_payload.py [số sự kiện] [tỉ lệ sinh nhật]
+Không cần mạng: dựng response giả theo đúng cấu trúc Event của Calendar v3,
+rồi áp dụng `fields` và `eventTypes` của LIST_PROFILE như phía server của Google.
+"""
+import gzip
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calendar_manager import LIST_PROFILE
+
+def make_event(idx, birthday=False):
+    start = f"2030-01-{idx % 28 + 1:02d}T{idx % 24:02d}:00:00+07:00"
+    email = f"user{idx % 50}@example.com"
+    return {
+        'kind': 'calendar#event',
+        'etag': f'"{random.getrandbits(60)}"',
+        'id': f'{random.getrandbits(100):026x}',
+        'status': 'confirmed',
+        'htmlLink': f'https://www.google.com/calendar/event?eid={random.getrandbits(160):040x}',
+        'created': '2029-12-01T08:00:00.000Z',
+        'updated': '2029-12-02T09:30:00.000Z',
+        'summary': f'Sinh nhật bạn {idx}' if birthday else f'Họp nhóm dự án {idx}',
+        'description': 'Họp về tiến độ dự án mới, chuẩn bị tài liệu trước khi họp',
+        'creator': {'email': email, 'self': True},
+        'organizer': {'email': email, 'self': True},
+        'start': {'dateTime': start, 'timeZone': 'Asia/Ho_Chi_Minh'},
+        'end': {'dateTime': start, 'timeZone': 'Asia/Ho_Chi_Minh'},
+        'iCalUID': f'{random.getrandbits(100):026x}@google.com',
+        'sequence': 0,
+        'attendees': [
+            {'email': f'guest{n}@example.com', 'responseStatus': 'needsAction'} for n in range(3)
+        ],
+        'reminders': {'useDefault': True},
+        'eventType': 'birthday' if birthday else 'default',
+    }
+
+def full_response(events):
+    return {
+        'kind': 'calendar#events',
+        'etag': '"p33c9bsjq4k2v60o"',
+        'summary': 'example@gmail.com',
+        'updated': '2029-12-02T09:30:00.000Z',
+        'timeZone': 'Asia/Ho_Chi_Minh',
+        'accessRole': 'owner',
+        'defaultReminders': [{'method': 'popup', 'minutes': 10}],
+        'nextPageToken': 'CigKGjR2ZXQ',
+        'items': events,
+    }
+
+def minimal_response(events):
+    """Response khi gửi kèm LIST_PROFILE (Google lọc và cắt trường phía server)"""
+    item_fields = LIST_PROFILE['fields'].split('items(')[1].split(')')[0].split(',')
+    event_types = set(LIST_PROFILE['eventTypes'])
+    return {
+        'nextPageToken': 'CigKGjR2ZXQ',
+        'items': [
+            {key: event[key] for key in item_fields if key in event}
+            for event in events if event['eventType'] in event_types
+        ],
+    }
+
+def bench(label, response, rounds):
+    body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+    compressed = gzip.compress(body)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        items = json.loads(gzip.decompress(compressed))['items']
+    parse = (time.perf_counter() - started) / rounds
+
+    print(f"{label:<10} {len(items):6d} sự kiện   {len(body) / 1024:9.1f} KiB   "
+          f"gzip {len(compressed) / 1024:8.1f} KiB   parse {parse * 1000:7.2f} ms")
+
+def main(count, birthday_ratio, rounds=20):
+    random.seed(0)
+    events = [make_event(idx, random.random() < birthday_ratio) for idx in range(count)]
+    bench('đầy đủ', full_response(events), rounds)
+    bench('tối giản', minimal_response(events), rounds)
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2500,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    )
@@ -0,0 +1,74 @@
+"""Đo thời gian khôi phục nhắc nhở khi khởi động lại bot.
+
+Chạy: python benchmarks/bench_rehydrate.py [số sự kiện]
+Cần MONGODB_URI trỏ tới một MongoDB có thể ghi; dữ liệu được ghi vào
+database riêng `calendar_bot_bench` và bị xóa khi kết thúc.
+
+Script mới được chạy thử với MongoDB giả lập trong bộ nhớ (mongomock) để kiểm
+tra nó chạy đúng; chưa có số liệu đo với MongoDB thật nên không có kết quả
+tham chiếu nào cho thời gian restart-to-ready.
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import DatabaseManager
+from scheduler import SchedulerManager
+
+BENCH_DB = 'calendar_bot_bench'
+
+async def seed(db, count):
+    await db.reminders.drop()
+    now = datetime.utcnow()
+    docs = []
+    for i in range(count):
+        event_time = now + timedelta(minutes=10 + i % 50000)
+        docs.append({
+            'event_id': f'bench_{i}',
+            'title': f'Sự kiện {i}',
+            'event_time': event_time,
+            'minutes_before': 5,
+            'repeat_times': 1,
+            'cleanup_at': event_time + timedelta(minutes=1)
+        })
+        if len(docs) == 10000:
+            await db.reminders.insert_many(docs, ordered=False)
+            docs = []
+    if docs:
+        await db.reminders.insert_many(docs, ordered=False)
+    # Thêm một phần sự kiện đã qua để kiểm tra truy vấn chỉ nạp sự kiện tương lai
+    await db.reminders.insert_many([{
+        'event_id': f'past_{i}',
+        'title': 'Đã qua',
+        'event_time': now - timedelta(days=1),
+        'minutes_before': 0,
+        'repeat_times': 1,
+        'cleanup_at': now - timedelta(days=1)
+    } for i in range(count // 10)], ordered=False)
+
+async def main(count):
+    db = DatabaseManager(db_name=BENCH_DB)
+    try:
+        await seed(db, count)
+        await db.ensure_schema()
+        scheduler = SchedulerManager(SimpleNamespace(db_manager=db))
+
+        started = time.perf_counter()
+        await scheduler.start()
+        elapsed = time.perf_counter() - started
+
+        print(f"Sự kiện đang chờ: {count}")
+        print(f"Chuỗi nhắc nhở đã đăng ký: {len(scheduler.engine)}")
+        print(f"Thời gian restart-to-ready: {elapsed:.3f}s")
+        await scheduler.stop()
+    finally:
+        await db.client.drop_database(BENCH_DB)
+        db.close()
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,35 @@
+"""So sánh thời gian tạo Calendar client: build() mỗi lần và discovery document dùng chung.
+
+Chạy: python benchmarks/bench_service_build.py [số lần]
+Không cần mạng: dùng discovery document tĩnh kèm theo googleapiclient.
+"""
+import sys
+import time
+from pathlib import Path
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calendar_manager import build_calendar_service, calendar_discovery_document
+
+def bench(label, func, rounds):
+    started = time.perf_counter()
+    func()  # Lần đầu (cold start)
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    warm = (time.perf_counter() - started) / rounds
+    print(f"{label:<28} lần đầu {cold * 1000:8.2f} ms   trung bình {warm * 1000:8.3f} ms/user")
+
+def main(rounds):
+    creds = Credentials(token='bench-token')
+    bench("build('calendar', 'v3')", lambda: build('calendar', 'v3', credentials=creds), rounds)
+    calendar_discovery_document()
+    bench("build_calendar_service()", lambda: build_calendar_service(creds), rounds)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
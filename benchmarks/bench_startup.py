@@ -0,0 +1,51 @@
+"""Báo cáo thời gian import khi khởi động bot (python -X importtime).
+
+Chạy: python benchmarks/bench_startup.py [số module hiển thị] [số lần chạy]
+Không cần token Discord hay MongoDB: chỉ import bot.py trong process con.
+Thời gian tới khi sẵn sàng (import, schema, khôi phục nhắc nhở, on_ready)
+được bot tự in ra ở dòng "⏱️ Khởi động" khi chạy thật.
+"""
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def import_times():
+    """Chạy `import bot` trong process mới, trả về [(module, thời gian riêng, thời gian cộng dồn)] (µs)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import bot'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def main(top, runs):
+    # Lần chạy đầu còn phải biên dịch .pyc nên lấy kết quả nhanh nhất trong các lần chạy
+    rows = min((import_times() for _ in range(runs)), key=lambda rows: rows[-1][2])
+    total = next(cumulative for name, _, cumulative in rows if name == 'bot')
+
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split('.')[0]] += self_us
+
+    print(f"Tổng thời gian import bot: {total / 1000:.1f} ms")
+    print(f"\nTheo package (thời gian riêng, top {top}):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {self_us / 1000:8.1f} ms")
+
+    print(f"\nTheo module (cộng dồn, top {top}):")
+    for name, _, cumulative in sorted(rows, key=lambda row: -row[2])[:top]:
+        print(f"  {name:<40} {cumulative / 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 15,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    )
@@ -1,17 +1,39 @@
+import time
+STARTED_AT = time.perf_counter()  # Mốc đo thời gian khởi động, lấy trước khi import các thư viện
+
 import discord
 from discord.ext import commands
 import asyncio
+import tempfile
+import traceback
 from datetime import datetime, timedelta
 import importlib.util
 import sys
 import os
 from pathlib import Path
-from calendar_manager import CalendarManager
-from config import DISCORD_TOKEN, COMMAND_PREFIX
+from calendar_manager import create_calendar_manager, EXPORT_FORMATS
+from credential_store import CredentialStore
+from calendar_sync import CalendarSync
+from event_pager import EventPager
+from event_importer import EventImporter, ImportStats, LOCAL_TZ
+from member_lookup import MemberLookup
+from utils.ics import aiter_ics_events
+from utils.metrics import COMMANDS, COMMAND_SECONDS
+from config import (
+    DISCORD_TOKEN, COMMAND_PREFIX, AUTH_CHANGE_STREAM, SYNC_MAX_AGE, SYNC_MAX_MIRRORS,
+    WEBHOOK_ENABLED, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PUBLIC_URL, WEBHOOK_TOKEN,
+    WATCH_TTL, WATCH_RENEW_BEFORE, CALENDAR_BACKEND, IMPORT_BATCH_SIZE, IMPORT_CONCURRENCY,
+    SHARD_IDS, SHARD_COUNT, LOW_MEMORY_MEMBERS, MEMBER_CACHE_SIZE, MEMBER_CACHE_TTL,
+    MEMBER_CACHE_NEGATIVE_TTL, METRICS_ENABLED, METRICS_HOST, METRICS_PORT
+)
 from database import DatabaseManager
 from scheduler import SchedulerManager
 from discord.ui import Select, View, Button
 
+LIST_PAGE_SIZE = 10
+DM_FILESIZE_LIMIT = 8 * 1024 * 1024  # Giới hạn upload khi không ở trong server
+DELETE_PAGE_SIZE = 25  # Số lựa chọn tối đa của một dropdown Discord
+
 class ContinueDeleteView(View):
     def __init__(self, bot, ctx):
         super().__init__(timeout=30)
@@ -48,10 +70,110 @@ class ContinueDeleteView(View):
         )
         await interaction.response.edit_message(embed=embed, view=None)
 
+def is_birthday(event):
+    """Sự kiện sinh nhật (không hiển thị trong list/del).
+
+    Sinh nhật từ danh bạ đã được Google lọc qua eventTypes, ở đây chỉ còn
+    lọc các sự kiện do người dùng tự đặt tên.
+    """
+    summary = event.get('summary', '').lower()
+    return "birthday" in summary or "sinh nhật" in summary
+
+def format_event_time(event):
+    start_time = event['start'].get('dateTime', event['start'].get('date'))
+    if 'T' in start_time:
+        dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+        return dt.strftime('%d/%m/%Y %H:%M')
+    dt = datetime.strptime(start_time, '%Y-%m-%d')
+    return dt.strftime('%d/%m/%Y')
+
+def build_import_embed(stats, filename):
+    """Embed hiển thị tiến độ import"""
+    embed = discord.Embed(
+        title="✅ Import hoàn tất" if stats.done else "📥 Đang import sự kiện...",
+        description=(
+            f"File: `{filename}`\n"
+            f"Đã đọc: **{stats.parsed}** sự kiện\n"
+            f"Đã thêm: **{stats.imported}**\n"
+            f"Bỏ qua (trùng): **{stats.duplicates}**\n"
+            f"Bỏ qua (đã qua): **{stats.past}**\n"
+            f"Lỗi: **{stats.failed}**"
+            + (f"\nKhông đặt được nhắc nhở: **{stats.no_reminder}**" if stats.no_reminder else "")
+        ),
+        color=discord.Color.green() if stats.done else discord.Color.blue()
+    )
+    return embed
+
+class ListView(View):
+    """Danh sách sự kiện chia trang, trang sau chỉ được tải khi bấm Tiếp"""
+
+    def __init__(self, pager):
+        super().__init__(timeout=120)
+        self.pager = pager
+        self.page = 0
+        self.page_events = []
+
+    async def load_page(self, page):
+        self.page = page
+        self.page_events = await self.pager.page(page)
+        self.clear_items()
+
+        self.prev_button = Button(
+            label="Trước",
+            style=discord.ButtonStyle.secondary,
+            emoji="⬅️",
+            disabled=page == 0
+        )
+        self.prev_button.callback = self.prev_callback
+        self.add_item(self.prev_button)
+
+        self.next_button = Button(
+            label="Tiếp",
+            style=discord.ButtonStyle.secondary,
+            emoji="➡️",
+            disabled=not self.pager.has_next(page)
+        )
+        self.next_button.callback = self.next_callback
+        self.add_item(self.next_button)
+
+    def build_embed(self):
+        embed = discord.Embed(
+            title="📅 Danh sách sự kiện sắp tới",
+            color=discord.Color.blue()
+        )
+
+        # Tạo danh sách theo dạng list, đánh số tiếp nối giữa các trang
+        description = ""
+        for idx, event in enumerate(self.page_events, self.page * self.pager.page_size + 1):
+            desc = event.get('description', 'Không có mô tả')
+            if len(desc) > 50:
+                desc = desc[:47] + "..."
+
+            description += f"**{idx}. {event['summary']}**\n"
+            description += f"⏰ {format_event_time(event)}\n"
+            description += f"📝 {desc}\n\n"
+
+        embed.description = description
+        embed.set_footer(text=f"Trang {self.page + 1} • 💡 Sử dụng b!add để thêm sự kiện mới")
+        return embed
+
+    async def prev_callback(self, interaction: discord.Interaction):
+        # Trả lời trước: tải trang có thể phải gọi Google API, lâu hơn hạn 3 giây của interaction
+        await interaction.response.defer()
+        await self.load_page(self.page - 1)
+        await interaction.edit_original_response(embed=self.build_embed(), view=self)
+
+    async def next_callback(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        await self.load_page(self.page + 1)
+        await interaction.edit_original_response(embed=self.build_embed(), view=self)
+
 class DeleteView(View):
-    def __init__(self, events, calendar_manager, db_manager, scheduler, bot, ctx, calendar_id, user_id):
+    def __init__(self, pager, calendar_manager, db_manager, scheduler, bot, ctx, calendar_id, user_id):
         super().__init__(timeout=60)
-        self.events = events
+        self.pager = pager  # Discord giới hạn 25 lựa chọn mỗi dropdown nên chia trang
+        self.page = 0
+        self.events = []
         self.calendar_manager = calendar_manager
         self.db_manager = db_manager
         self.scheduler = scheduler
@@ -59,20 +181,19 @@ class DeleteView(View):
         self.ctx = ctx
         self.calendar_id = calendar_id  # Thêm calendar_id
         self.user_id = user_id  # Thêm user_id
-        
+
+    async def load_page(self, page):
+        """Tải sự kiện của trang `page` và dựng lại dropdown"""
+        self.page = page
+        self.events = await self.pager.page(page)
+        self.clear_items()
+        if not self.events:
+            return
+
         # Tạo dropdown menu
         select_options = []
-        for idx, event in enumerate(events, 1):
-            title = event['summary']
-            start_time = event['start'].get('dateTime', event['start'].get('date'))
-            if 'T' in start_time:
-                dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                time_str = dt.strftime('%d/%m/%Y %H:%M')
-            else:
-                dt = datetime.strptime(start_time, '%Y-%m-%d')
-                time_str = dt.strftime('%d/%m/%Y')
-                
-            label = f"{title} - {time_str}"
+        for idx, event in enumerate(self.events, 1):
+            label = f"{event['summary']} - {format_event_time(event)}"
             if len(label) > 100:  # Discord có giới hạn độ dài label
                 label = label[:97] + "..."
                 
@@ -84,15 +205,35 @@ class DeleteView(View):
                 )
             )
         
-        # Thêm dropdown vào view
+        # Thêm dropdown vào view, cho phép chọn nhiều sự kiện để xóa cùng lúc
         self.select = Select(
-            placeholder="Chọn sự kiện cần xóa...",
+            placeholder=f"Chọn sự kiện cần xóa... (trang {page + 1})",
             options=select_options,
             min_values=1,
-            max_values=1
+            max_values=len(select_options)
         )
         self.select.callback = self.select_callback
         self.add_item(self.select)
+
+        # Nút chuyển trang chỉ hiện khi có nhiều hơn một trang
+        if page > 0 or self.pager.has_next(page):
+            self.prev_button = Button(
+                label="Trước",
+                style=discord.ButtonStyle.secondary,
+                emoji="⬅️",
+                disabled=page == 0
+            )
+            self.prev_button.callback = self.prev_callback
+            self.add_item(self.prev_button)
+
+            self.next_button = Button(
+                label="Tiếp",
+                style=discord.ButtonStyle.secondary,
+                emoji="➡️",
+                disabled=not self.pager.has_next(page)
+            )
+            self.next_button.callback = self.next_callback
+            self.add_item(self.next_button)
         
         # Thêm nút hủy
         self.cancel_button = Button(
@@ -102,21 +243,44 @@ class DeleteView(View):
         )
         self.cancel_button.callback = self.cancel_callback
         self.add_item(self.cancel_button)
+
+    async def prev_callback(self, interaction: discord.Interaction):
+        # Trả lời trước: tải trang có thể phải gọi Google API, lâu hơn hạn 3 giây của interaction
+        await interaction.response.defer()
+        await self.load_page(self.page - 1)
+        await interaction.edit_original_response(view=self)
+
+    async def next_callback(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        await self.load_page(self.page + 1)
+        await interaction.edit_original_response(view=self)
         
     async def select_callback(self, interaction: discord.Interaction):
         try:
-            idx = int(self.select.values[0])
-            event = self.events[idx]
-            event_id = event['id']
+            selected = [self.events[int(value)] for value in self.select.values]
+            event_ids = [event['id'] for event in selected]
+            
+            # Xóa tất cả sự kiện đã chọn trong một batch request
+            results = await self.calendar_manager.delete_events(
+                event_ids, self.user_id, calendar_id=self.calendar_id
+            )
+            deleted = [event for event, result in zip(selected, results) if result['ok']]
             
-            if await self.calendar_manager.delete_event(event_id, self.user_id, calendar_id=self.calendar_id):
-                self.db_manager.delete_event(event_id)
-                await self.scheduler.remove_reminder(event_id)
+            if deleted:
+                deleted_ids = [event['id'] for event in deleted]
+                await self.db_manager.delete_events(deleted_ids)
+                self.bot.calendar_sync.discard(self.user_id, self.calendar_id, deleted_ids)
+                self.pager.remove(deleted_ids)
+                for event_id in deleted_ids:
+                    await self.scheduler.remove_reminder(event_id)
                 
                 # Hiện thông báo xóa thành công
+                description = "\n".join(f"**{event['summary']}**" for event in deleted)
+                if len(deleted) < len(selected):
+                    description += f"\n\n⚠️ Không thể xóa {len(selected) - len(deleted)} sự kiện"
                 embed = discord.Embed(
                     title="✅ Đã xóa sự kiện",
-                    description=f"**{event['summary']}**",
+                    description=description,
                     color=discord.Color.green()
                 )
                 
@@ -257,7 +421,8 @@ class ReminderSelectView(View):
                 self.title,
                 self.datetime_str,
                 self.first_reminder,
-                self.repeat_times
+                self.repeat_times,
+                interaction.guild_id
             )
             
             # Hiển thị thông báo thành công
@@ -276,35 +441,177 @@ class ReminderSelectView(View):
                 ephemeral=True
             )
 
-class CalendarBot(commands.Bot):
-    def __init__(self):
+class CalendarBot(commands.AutoShardedBot):
+    def __init__(self, shard_ids=None, shard_count=None):
         # Cập nhật intents để có thể đọc member data
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True  # Thêm quyền đọc members
         intents.guilds = True   # Thêm quyền đọc guild data
+
+        member_options = {}
+        if LOW_MEMORY_MEMBERS:
+            # Không tải member của mọi server khi khởi động và không cache member từ gateway,
+            # member cần dùng được giữ/tra cứu qua self.member_lookup
+            member_options = {
+                'member_cache_flags': discord.MemberCacheFlags.none(),
+                'chunk_guilds_at_startup': False
+            }
         
         # Sử dụng case_insensitive=True để bỏ qua hoa thường trong prefix
+        # Tự chia shard trong một process; khi chạy qua launcher.py mỗi process
+        # chỉ giữ một dải shard_ids
         super().__init__(
             command_prefix=COMMAND_PREFIX, 
             intents=intents,
-            case_insensitive=True
+            case_insensitive=True,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            **member_options
+        )
+        self.member_lookup = MemberLookup(
+            maxsize=MEMBER_CACHE_SIZE,
+            ttl=MEMBER_CACHE_TTL,
+            negative_ttl=MEMBER_CACHE_NEGATIVE_TTL
         )
         
-        self.calendar_manager = CalendarManager()
         self.db_manager = DatabaseManager()
+        self.calendar_manager = create_calendar_manager(
+            CredentialStore(self.db_manager),
+            CALENDAR_BACKEND
+        )
+        self.calendar_sync = CalendarSync(
+            self.calendar_manager,
+            max_age=SYNC_MAX_AGE,
+            max_mirrors=SYNC_MAX_MIRRORS,
+            on_changes=lambda changed: self.scheduler.apply_calendar_changes(changed)
+        )
         self.scheduler = SchedulerManager(self)
+        self.importer = EventImporter(
+            self,
+            batch_size=IMPORT_BATCH_SIZE,
+            concurrency=IMPORT_CONCURRENCY
+        )
+        self.webhook = None
+        self.startup_timings = {'import': time.perf_counter() - STARTED_AT}
+        self.services_status = 'starting'  # 'starting', 'ok' hoặc 'failed' (hiển thị ở /healthz)
+        self._services_task = None
+        # Mọi process đăng ký kênh watch (lưu trong MongoDB); Google chỉ gửi thông báo
+        # tới một URL nên chỉ process giữ shard 0 nhận webhook và gia hạn kênh
+        if WEBHOOK_ENABLED and WEBHOOK_PUBLIC_URL:
+            from calendar_webhook import CalendarWebhook  # aiohttp.web chỉ cần khi bật webhook
+
+            self.webhook = CalendarWebhook(
+                self,
+                WEBHOOK_PUBLIC_URL,
+                token=WEBHOOK_TOKEN,
+                host=WEBHOOK_HOST,
+                port=WEBHOOK_PORT,
+                ttl=WATCH_TTL,
+                renew_before=WATCH_RENEW_BEFORE,
+                serve=shard_ids is None or 0 in shard_ids
+            )
+        self.metrics = None
+        if METRICS_ENABLED:
+            from metrics_server import MetricsServer
+
+            # Mỗi process một cổng riêng khi chạy qua launcher.py
+            self.metrics = MetricsServer(
+                self,
+                host=METRICS_HOST,
+                port=METRICS_PORT + (min(shard_ids) if shard_ids else 0)
+            )
         
     async def setup_hook(self):
+        if self.metrics:
+            await self.metrics.start()
         await self.add_commands()
+        self.before_invoke(self._before_command)
+        self.after_invoke(self._after_command)
+        self.calendar_manager.token_refresher.on_revoked = self.notify_token_revoked
+        self.calendar_manager.token_refresher.start()
+        if AUTH_CHANGE_STREAM:
+            self.loop.create_task(self.db_manager.watch_authorized_users())
+        # Khởi tạo database và scheduler chạy song song với kết nối gateway
+        # (nhắc nhở gửi qua HTTP nên không cần chờ on_ready)
+        self._services_task = self.loop.create_task(self.start_services())
+
+    async def _timed(self, name, coro):
+        started = time.perf_counter()
+        result = await coro
+        self.startup_timings[name] = time.perf_counter() - started
+        return result
+
+    async def start_services(self):
+        """Tạo index, khôi phục nhắc nhở, nạp sẵn discovery document rồi bật webhook"""
+        try:
+            await asyncio.gather(
+                self._timed('schema', self.db_manager.ensure_schema()),
+                self._timed('scheduler', self.scheduler.start()),
+                self._timed('calendar', self.calendar_manager.warm_up())
+            )
+            if self.webhook:
+                await self._timed('webhook', self.webhook.start())
+            self.services_status = 'ok'
+        except Exception as e:
+            self.services_status = 'failed'
+            print(f"❌ Lỗi khi khởi tạo dịch vụ: {str(e)}")
+            print(traceback.format_exc())
+            await self.close()
+
+    async def _before_command(self, ctx):
+        ctx.started_at = time.perf_counter()
+
+    async def _after_command(self, ctx):
+        """Ghi số lần chạy và thời gian xử lý của lệnh (gọi cả khi lệnh bị lỗi)"""
+        name = ctx.command.qualified_name
+        COMMAND_SECONDS.observe(time.perf_counter() - ctx.started_at, command=name)
+        COMMANDS.inc(command=name, status='error' if ctx.command_failed else 'ok')
+
+    def print_startup_report(self):
+        labels = {
+            'import': 'import',
+            'schema': 'schema MongoDB',
+            'scheduler': 'khôi phục nhắc nhở',
+            'calendar': 'discovery Calendar API',
+            'webhook': 'webhook',
+            'ready': 'sẵn sàng sau'
+        }
+        parts = [
+            f"{label} {self.startup_timings[key]:.2f}s"
+            for key, label in labels.items() if key in self.startup_timings
+        ]
+        print(f"⏱️ Khởi động: {', '.join(parts)}")
+
+    async def notify_token_revoked(self, user_id: str):
+        """Báo cho user biết quyền truy cập Google Calendar đã bị thu hồi"""
+        embed = discord.Embed(
+            title="🔑 Cần xác thực lại Google Calendar",
+            description=(
+                "Quyền truy cập Google Calendar của bạn đã hết hiệu lực hoặc bị thu hồi.\n"
+                f"1. Truy cập link: {self.calendar_manager.get_authorization_url()}\n"
+                "2. Đăng nhập và cho phép quyền truy cập\n"
+                "3. Sao chép mã xác thực\n"
+                "4. Sử dụng lệnh: `B!auth <mã xác thực>`"
+            ),
+            color=discord.Color.red()
+        )
+        await self.scheduler.recipients.send(int(user_id), embed)
+
+    def watch_calendar(self, user_id: str, calendar_id):
+        """Đăng ký nhận push notification cho calendar của user (nếu bật webhook)"""
+        if self.webhook:
+            self.webhook.watch_in_background(user_id, calendar_id)
         
     async def add_commands(self):
         # Tạo decorator kiểm tra quyền sử dụng bot
         def is_authorized():
             async def predicate(ctx):
+                # Giữ lại member đang dùng bot để gửi nhắc nhở vào server mà không cần tra cứu lại
+                self.member_lookup.remember(ctx.author)
                 # Nếu là admin server hoặc người được authorized
                 return (ctx.author.guild_permissions.administrator or 
-                        self.db_manager.is_authorized(str(ctx.author.id)))
+                        await self.db_manager.is_authorized(str(ctx.author.id)))
             return commands.check(predicate)
 
         @self.command(name='adduser')
@@ -312,7 +619,7 @@ class CalendarBot(commands.Bot):
         async def add_authorized_user(ctx, user: discord.Member):
             """Thêm user được phép sử dụng bot"""
             try:
-                self.db_manager.add_authorized_user(str(user.id))
+                await self.db_manager.add_authorized_user(str(user.id))
                 embed = discord.Embed(
                     title="✅ Đã thêm người dùng",
                     description=f"User {user.mention} đã được cấp quyền sử dụng bot",
@@ -327,7 +634,7 @@ class CalendarBot(commands.Bot):
         async def remove_authorized_user(ctx, user: discord.Member):
             """Xóa quyền sử dụng bot của user"""
             try:
-                self.db_manager.remove_authorized_user(str(user.id))
+                await self.db_manager.remove_authorized_user(str(user.id))
                 embed = discord.Embed(
                     title="✅ Đã xóa người dùng",
                     description=f"User {user.mention} đã bị thu hồi quyền sử dụng bot",
@@ -342,7 +649,7 @@ class CalendarBot(commands.Bot):
         @is_authorized()
         async def add_event(ctx, *, content=""):
             # Kiểm tra calendar id của user
-            calendar_id = self.db_manager.get_user_calendar(str(ctx.author.id))
+            calendar_id = await self.db_manager.get_user_calendar(str(ctx.author.id))
             if not calendar_id:
                 embed = discord.Embed(
                     title="❌ Calendar chưa được thiết lập",
@@ -397,7 +704,10 @@ class CalendarBot(commands.Bot):
                     )
                     
                     if event_id:
-                        self.db_manager.save_event(event_id, title, datetime_str, description, str(ctx.author.id))  # Thêm ID người tạo
+                        await self.db_manager.save_event(event_id, title, datetime_str, description, str(ctx.author.id))  # Thêm ID người tạo
+                        await self.scheduler.recipients.remember(ctx.author, ctx.guild)
+                        self.calendar_sync.mark_stale(str(ctx.author.id), calendar_id)
+                        self.watch_calendar(str(ctx.author.id), calendar_id)
                         event_embed = discord.Embed(
                             title="✅ Sự kiện đã được tạo",
                             description=(
@@ -432,92 +742,38 @@ class CalendarBot(commands.Bot):
         @is_authorized()
         async def list_events(ctx):
             # Lấy và sử dụng calendar_id của user
-            calendar_id = self.db_manager.get_user_calendar(str(ctx.author.id))
-            # Truyền user_id vào list_events
-            events = await self.calendar_manager.list_events(
-                str(ctx.author.id),
-                calendar_id=calendar_id
+            calendar_id = await self.db_manager.get_user_calendar(str(ctx.author.id))
+            self.watch_calendar(str(ctx.author.id), calendar_id)
+            # Đọc sự kiện theo từng trang, trang sau chỉ tải khi người dùng bấm Tiếp
+            pager = EventPager(
+                self.calendar_sync.iter_upcoming(str(ctx.author.id), calendar_id=calendar_id),
+                page_size=LIST_PAGE_SIZE,
+                predicate=lambda event: not is_birthday(event)  # Lọc bỏ các sự kiện sinh nhật
             )
-            if not events:
+            view = ListView(pager)
+            await view.load_page(0)
+            if not view.page_events:
                 await ctx.send("Không có sự kiện nào sắp tới.")
                 return
 
-            # Lọc bỏ các sự kiện sinh nhật
-            filtered_events = [
-                event for event in events 
-                if not "birthday" in event.get('summary', '').lower() 
-                and not "sinh nhật" in event.get('summary', '').lower()
-            ]
-
-            if not filtered_events:
-                await ctx.send("Không có sự kiện nào sắp tới.")
-                return
-
-            # Tạo bảng sự kiện
-            embed = discord.Embed(
-                title="📅 Danh sách sự kiện sắp tới",
-                color=discord.Color.blue()
-            )
-
-            # Tạo danh sách theo dạng list
-            description = ""
-            for idx, event in enumerate(filtered_events, 1):
-                title = event['summary']
-                
-                # Chuyển đổi thời gian
-                start_time = event['start'].get('dateTime', event['start'].get('date'))
-                if 'T' in start_time:
-                    dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                    time_str = dt.strftime('%d/%m/%Y %H:%M')
-                else:
-                    dt = datetime.strptime(start_time, '%Y-%m-%d')
-                    time_str = dt.strftime('%d/%m/%Y')
-                
-                desc = event.get('description', 'Không có mô tả')
-                if len(desc) > 50:
-                    desc = desc[:47] + "..."
-                
-                description += f"**{idx}. {title}**\n"
-                description += f"⏰ {time_str}\n"
-                description += f"📝 {desc}\n\n"
-
-            embed.description = description
-            embed.set_footer(text="💡 Sử dụng b!add để thêm sự kiện mới")
-            
-            await ctx.send(embed=embed)
+            await ctx.send(embed=view.build_embed(), view=view)
 
         @self.command(name='del')
         @is_authorized()
         async def delete_event(ctx):
             """Xóa sự kiện bằng dropdown menu"""
             # Lấy và sử dụng calendar_id của user
-            calendar_id = self.db_manager.get_user_calendar(str(ctx.author.id))
-            # Truyền user_id vào list_events
-            events = await self.calendar_manager.list_events(
-                str(ctx.author.id),
-                calendar_id=calendar_id
-            )
-            
-            # Lọc bỏ các sự kiện sinh nhật
-            filtered_events = [
-                event for event in events 
-                if not "birthday" in event.get('summary', '').lower() 
-                and not "sinh nhật" in event.get('summary', '').lower()
-            ]
-
-            if not filtered_events:
-                await ctx.send("❌ Không có sự kiện nào để xóa.")
-                return
-
-            embed = discord.Embed(
-                title="🗑️ Xóa sự kiện",
-                description="Chọn sự kiện bạn muốn xóa từ danh sách bên dưới:",
-                color=discord.Color.blue()
+            calendar_id = await self.db_manager.get_user_calendar(str(ctx.author.id))
+            self.watch_calendar(str(ctx.author.id), calendar_id)
+            pager = EventPager(
+                self.calendar_sync.iter_upcoming(str(ctx.author.id), calendar_id=calendar_id),
+                page_size=DELETE_PAGE_SIZE,
+                predicate=lambda event: not is_birthday(event)  # Lọc bỏ các sự kiện sinh nhật
             )
             
             # Tạo view với dropdown và button, truyền thêm bot và ctx
             view = DeleteView(
-                filtered_events,
+                pager,
                 self.calendar_manager,
                 self.db_manager,
                 self.scheduler,
@@ -526,14 +782,24 @@ class CalendarBot(commands.Bot):
                 calendar_id,  # Thêm calendar_id
                 str(ctx.author.id)  # Thêm user_id
             )
-            
+            await view.load_page(0)
+
+            if not view.events:
+                await ctx.send("❌ Không có sự kiện nào để xóa.")
+                return
+
+            embed = discord.Embed(
+                title="🗑️ Xóa sự kiện",
+                description="Chọn sự kiện bạn muốn xóa từ danh sách bên dưới:",
+                color=discord.Color.blue()
+            )
             await ctx.send(embed=embed, view=view)
 
         @self.command(name='test')
         @is_authorized()
         async def add_test_event(ctx):
             # Kiểm tra calendar id của user
-            calendar_id = self.db_manager.get_user_calendar(str(ctx.author.id))
+            calendar_id = await self.db_manager.get_user_calendar(str(ctx.author.id))
             if not calendar_id:
                 embed = discord.Embed(
                     title="❌ Chưa cài đặt Calendar",
@@ -562,13 +828,14 @@ class CalendarBot(commands.Bot):
                 )
                 
                 if event_id:
-                    self.db_manager.save_event(
+                    await self.db_manager.save_event(
                         event_id,
                         test_data['title'],
                         test_data['datetime'],
                         test_data['description'],
                         str(ctx.author.id)  # Thêm ID người tạo
                     )
+                    await self.scheduler.recipients.remember(ctx.author, ctx.guild)
                     
                     embed = discord.Embed(
                         title="Sự kiện Test đã được tạo",
@@ -584,13 +851,115 @@ class CalendarBot(commands.Bot):
                     await self.scheduler.schedule_reminder(
                         event_id,
                         test_data['title'],
-                        test_data['datetime']
+                        test_data['datetime'],
+                        guild_id=ctx.guild.id if ctx.guild else None
                     )
                 else:
                     await ctx.send("Không thể tạo sự kiện test. Vui lòng thử lại.")
             except Exception as e:
                 await ctx.send(f"Lỗi khi tạo sự kiện test: {str(e)}")
 
+        @self.command(name='import')
+        @is_authorized()
+        async def import_events(ctx, minutes_before: int = 0):
+            """Import sự kiện từ file .ics đính kèm"""
+            calendar_id = await self.db_manager.get_user_calendar(str(ctx.author.id))
+            if not calendar_id:
+                embed = discord.Embed(
+                    title="❌ Chưa cài đặt Calendar",
+                    description="Bạn cần cài đặt Calendar ID trước khi import sự kiện. Sử dụng lệnh:\n`b!setcalendar your.email@gmail.com`",
+                    color=discord.Color.red()
+                )
+                await ctx.send(embed=embed)
+                return
+
+            attachment = next(
+                (a for a in ctx.message.attachments if a.filename.lower().endswith('.ics')),
+                None
+            )
+            if not attachment or minutes_before < 0:
+                await ctx.send("❌ Vui lòng đính kèm file `.ics` cùng lệnh:\n"
+                             "`b!import [số phút nhắc trước]`\n"
+                             "Ví dụ: `b!import 15` (nhắc trước 15 phút)")
+                return
+
+            progress_message = await ctx.send(embed=build_import_embed(ImportStats(), attachment.filename))
+            last_update = time.monotonic()
+
+            async def on_progress(stats):
+                nonlocal last_update
+                # Discord giới hạn tốc độ sửa tin nhắn: cập nhật tiến độ tối đa mỗi 2 giây
+                if not stats.done and time.monotonic() - last_update < 2:
+                    return
+                last_update = time.monotonic()
+                try:
+                    await progress_message.edit(embed=build_import_embed(stats, attachment.filename))
+                except discord.HTTPException as e:
+                    print(f"Không thể cập nhật tiến độ import: {str(e)}")
+
+            try:
+                import aiohttp
+                # Đọc file từ CDN của Discord theo từng dòng thay vì tải toàn bộ vào bộ nhớ
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(attachment.url) as response:
+                        response.raise_for_status()
+                        stats = await self.importer.run(
+                            str(ctx.author.id),
+                            calendar_id,
+                            aiter_ics_events(response.content, LOCAL_TZ),
+                            minutes_before=minutes_before,
+                            guild_id=ctx.guild.id if ctx.guild else None,
+                            on_progress=on_progress
+                        )
+
+                if stats.imported:
+                    await self.scheduler.recipients.remember(ctx.author, ctx.guild)
+                    self.calendar_sync.mark_stale(str(ctx.author.id), calendar_id)
+                    self.watch_calendar(str(ctx.author.id), calendar_id)
+            except Exception as e:
+                await ctx.send(f"❌ Lỗi khi import: {str(e)}")
+
+        @self.command(name='export')
+        @is_authorized()
+        async def export_events(ctx, fmt: str = 'ics'):
+            """Xuất các sự kiện sắp tới ra file .ics hoặc .csv"""
+            fmt = fmt.lower()
+            if fmt not in EXPORT_FORMATS:
+                await ctx.send("❌ Định dạng không hợp lệ!\n"
+                             "Sử dụng lệnh: `b!export [ics|csv]`")
+                return
+
+            calendar_id = await self.db_manager.get_user_calendar(str(ctx.author.id))
+            if not calendar_id:
+                embed = discord.Embed(
+                    title="❌ Chưa cài đặt Calendar",
+                    description="Bạn cần cài đặt Calendar ID trước khi xuất sự kiện. Sử dụng lệnh:\n`b!setcalendar your.email@gmail.com`",
+                    color=discord.Color.red()
+                )
+                await ctx.send(embed=embed)
+                return
+
+            limit = ctx.guild.filesize_limit if ctx.guild else DM_FILESIZE_LIMIT
+            try:
+                async with ctx.typing():
+                    # Ghi từng trang ra file tạm thay vì giữ toàn bộ nội dung trong bộ nhớ
+                    with tempfile.TemporaryFile() as fp:
+                        async for chunk in self.calendar_manager.export_events(
+                            str(ctx.author.id), calendar_id, fmt
+                        ):
+                            fp.write(chunk.encode('utf-8'))
+                            if fp.tell() > limit:
+                                await ctx.send("❌ File xuất ra vượt quá giới hạn upload của Discord.")
+                                return
+
+                        fp.seek(0)
+                        await ctx.send(
+                            "📤 Các sự kiện sắp tới của bạn:",
+                            file=discord.File(fp, filename=f"calendar.{fmt}")
+                        )
+            except Exception as e:
+                await ctx.send(f"❌ Lỗi khi xuất sự kiện: {str(e)}")
+
         @self.command(name='setcalendar')
         @is_authorized()
         async def set_calendar(ctx, email=None):
@@ -621,7 +990,7 @@ class CalendarBot(commands.Bot):
                     return
 
                 # Lưu email làm calendar_id
-                self.db_manager.save_user_calendar(str(ctx.author.id), email)
+                await self.db_manager.save_user_calendar(str(ctx.author.id), email)
                 
                 embed = discord.Embed(
                     title="✅ Calendar đã được thiết lập",
@@ -642,7 +1011,7 @@ class CalendarBot(commands.Bot):
         async def show_calendar(ctx):
             """Hiển thị Calendar ID hiện tại của người dùng"""
             try:
-                calendar_id = self.db_manager.get_user_calendar(str(ctx.author.id))
+                calendar_id = await self.db_manager.get_user_calendar(str(ctx.author.id))
                 if (calendar_id):
                     embed = discord.Embed(
                         title="📅 Calendar của bạn",
@@ -684,6 +1053,16 @@ class CalendarBot(commands.Bot):
                     "example": "B!del",
                     "desc": "Hiện danh sách và xóa sự kiện theo lựa chọn"
                 },
+                "import": {
+                    "format": "<B! hoặc b!>import [số phút nhắc trước] + file .ics đính kèm",
+                    "example": "B!import 15",
+                    "desc": "Import hàng loạt sự kiện sắp tới từ file .ics"
+                },
+                "export": {
+                    "format": "<B! hoặc b!>export [ics|csv]",
+                    "example": "B!export csv",
+                    "desc": "Xuất các sự kiện sắp tới ra file .ics (mặc định) hoặc .csv"
+                },
                 "test": {
                     "format": "<B! hoặc b!>test",
                     "example": "B!test",
@@ -749,10 +1128,40 @@ class CalendarBot(commands.Bot):
 
     async def on_ready(self):
         print(f'{self.user} đã sẵn sàng!')
-        await self.scheduler.start()
+        if 'ready' not in self.startup_timings:  # on_ready được gọi lại khi reconnect
+            self.startup_timings['ready'] = time.perf_counter() - STARTED_AT
+            self.print_startup_report()
+
+    # Cập nhật cache nơi nhận nhắc nhở theo thay đổi member/guild
+    async def on_member_join(self, member):
+        self.scheduler.recipients.on_member_join(member)
+
+    async def on_raw_member_remove(self, payload):
+        # Dạng raw vẫn được gửi khi member không có trong cache (chế độ tiết kiệm bộ nhớ)
+        self.member_lookup.forget(payload.guild_id, payload.user.id)
+        self.scheduler.recipients.on_member_remove(payload.guild_id, payload.user.id)
+
+    async def on_guild_remove(self, guild):
+        self.scheduler.recipients.on_guild_remove(guild)
+
+    async def on_guild_channel_delete(self, channel):
+        self.scheduler.recipients.on_guild_channel_delete(channel)
+
+    async def close(self):
+        if self._services_task and not self._services_task.done() and \
+                self._services_task is not asyncio.current_task():
+            self._services_task.cancel()
+        await self.scheduler.stop()
+        if self.webhook:
+            await self.webhook.stop()
+        if self.metrics:
+            await self.metrics.stop()
+        await super().close()
+        await self.calendar_manager.close()
+        self.db_manager.close()
 
-def run_bot():
-    bot = CalendarBot()
+def run_bot(shard_ids=SHARD_IDS, shard_count=SHARD_COUNT):
+    bot = CalendarBot(shard_ids=shard_ids, shard_count=shard_count)
     bot.run(DISCORD_TOKEN)
 
 if __name__ == "__main__":
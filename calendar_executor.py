@@ -0,0 +1,92 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import CALENDAR_REQUESTS, CALENDAR_SECONDS, observe
+
+class CalendarExecutor:
+    """Thread pool riêng cho các lời gọi Google API (blocking).
+
+    Giới hạn số lời gọi đồng thời toàn cục và theo từng user, để calendar
+    chậm của một user không chiếm hết thread của mọi người khác. Các lời
+    gọi phải chờ sẽ xếp hàng trên event loop (không chiếm thread) và được
+    ghi nhận độ sâu hàng đợi và thời gian chờ.
+    """
+
+    def __init__(self, max_workers=16, per_user_limit=4):
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='calendar-io')
+        self._global = None
+        self._users = {}  # user_id -> [semaphore, số lời gọi đang dùng]
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._closed = False
+
+    def stats(self):
+        return {
+            'waiting': self.waiting,
+            'active': self.active,
+            'completed': self.completed,
+            'failed': self.failed,
+            'avg_wait': self.total_wait / self.completed if self.completed else 0.0,
+            'max_wait': self.max_wait
+        }
+
+    def _user_slot(self, user_id):
+        slot = self._users.get(user_id)
+        if slot is None:
+            slot = self._users[user_id] = [asyncio.Semaphore(self.per_user_limit), 0]
+        slot[1] += 1
+        return slot
+
+    def _release_user_slot(self, user_id, slot):
+        slot[1] -= 1
+        if slot[1] == 0:
+            del self._users[user_id]
+
+    async def run(self, user_id, func, *args, api='call'):
+        """Chạy hàm blocking `func(*args)` trong pool, tuân theo giới hạn của user.
+
+        `api` là tên method Calendar API dùng để ghi metrics thời gian gọi.
+        """
+        if self._closed:
+            raise RuntimeError("Calendar executor đã dừng")
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_workers)
+
+        enqueued = time.perf_counter()
+        started = False
+        self.waiting += 1
+        slot = self._user_slot(user_id)
+        try:
+            async with slot[0]:
+                async with self._global:
+                    started = True
+                    self.waiting -= 1
+                    wait = time.perf_counter() - enqueued
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+
+                    self.active += 1
+                    try:
+                        with observe(CALENDAR_REQUESTS, CALENDAR_SECONDS, method=api):
+                            return await asyncio.get_event_loop().run_in_executor(self._pool, func, *args)
+                    except Exception:
+                        self.failed += 1
+                        raise
+                    finally:
+                        self.active -= 1
+                        self.completed += 1
+        finally:
+            if not started:  # Bị hủy khi còn đang chờ
+                self.waiting -= 1
+            self._release_user_slot(user_id, slot)
+
+    def shutdown(self, wait=False):
+        """Dừng nhận lời gọi mới và giải phóng thread pool"""
+        self._closed = True
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,226 @@
+import asyncio
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import aiohttp
+
+from calendar_manager import CalendarManager, SyncTokenExpired, INSERT_FIELDS
+from config import CALENDAR_HTTP_POOL_SIZE
+from utils.metrics import CALENDAR_REQUESTS, CALENDAR_SECONDS, observe
+
+API_BASE = 'https://www.googleapis.com/calendar/v3'
+BULK_CONCURRENCY = 10  # Số request đồng thời khi thêm/xóa hàng loạt
+
+class CalendarApiError(Exception):
+    """Lỗi HTTP từ Calendar API"""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+class AiohttpCalendarManager(CalendarManager):
+    """Backend gọi Calendar v3 REST trực tiếp qua aiohttp.
+
+    Dùng chung một ClientSession keep-alive (connection pool, nén gzip) cho
+    mọi user, làm mới token bằng request bất đồng bộ nên các lời gọi API
+    không cần đi qua thread pool.
+    """
+
+    def __init__(self, credential_store):
+        super().__init__(credential_store)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=CALENDAR_HTTP_POOL_SIZE,
+                    keepalive_timeout=60,
+                    ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(total=30),
+                headers={
+                    'Accept-Encoding': 'gzip',
+                    'User-Agent': 'CalenderDiscordBot (gzip)'  # Google chỉ nén khi User-Agent có "gzip"
+                }
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        await super().close()
+
+    async def warm_up(self):
+        # Backend này không dùng googleapiclient
+        pass
+
+    async def _create_service(self, user_id: str, creds):
+        # Backend này chỉ cần credentials để ký request
+        return creds
+
+    async def _refresh_credentials(self, user_id: str, creds):
+        """Làm mới access token bằng request bất đồng bộ tới token endpoint"""
+        data = {
+            'grant_type': 'refresh_token',
+            'client_id': creds.client_id,
+            'client_secret': creds.client_secret,
+            'refresh_token': creds.refresh_token,
+        }
+        with observe(CALENDAR_REQUESTS, CALENDAR_SECONDS, method='token.refresh'):
+            async with self._get_session().post(creds.token_uri, data=data) as response:
+                try:
+                    payload = await response.json(content_type=None)
+                except ValueError:  # Trang lỗi HTML/text từ proxy hoặc khi Google quá tải
+                    payload = None
+                if not isinstance(payload, dict):
+                    payload = {}
+                if response.status != 200 or 'access_token' not in payload:
+                    from google.auth.exceptions import RefreshError
+                    error = payload.get('error')
+                    description = payload.get('error_description') or response.reason
+                    if response.status in (400, 401) and error == 'invalid_grant':
+                        # Refresh token bị thu hồi hoặc hết hạn: user phải xác thực lại
+                        raise RefreshError(f"invalid_grant: {description}", payload)
+                    # Lỗi tạm thời (5xx, 429...): giữ credentials để lần sau thử lại
+                    raise RefreshError(
+                        f"HTTP {response.status}: {error or description}", payload, retryable=True
+                    )
+
+        creds.token = payload['access_token']
+        creds.expiry = datetime.utcnow() + timedelta(seconds=int(payload.get('expires_in', 3600)))
+
+    async def _ensure_fresh(self, user_id: str, creds, force=False):
+        async with self._auth_lock(user_id):
+            if force or not creds.valid:
+                await self._refresh_credentials(user_id, creds)
+                await self._save_credentials(user_id, creds)
+
+    @staticmethod
+    def _encode_params(params):
+        encoded = []
+        for key, value in (params or {}).items():
+            if value is None:
+                continue
+            for item in (value if isinstance(value, (list, tuple)) else [value]):
+                if isinstance(item, bool):
+                    item = 'true' if item else 'false'
+                encoded.append((key, str(item)))
+        return encoded
+
+    async def _request(self, user_id: str, method, path, params=None, body=None, api='call'):
+        """Gọi Calendar REST API, `api` là tên method dùng để ghi metrics"""
+        creds = await self._require_service(user_id)
+        if not creds.valid:
+            await self._ensure_fresh(user_id, creds)
+
+        with observe(CALENDAR_REQUESTS, CALENDAR_SECONDS, method=api):
+            for attempt in range(2):
+                async with self._get_session().request(
+                    method,
+                    API_BASE + path,
+                    params=self._encode_params(params),
+                    json=body,
+                    headers={'Authorization': f'Bearer {creds.token}'}
+                ) as response:
+                    if response.status == 401 and attempt == 0 and creds.refresh_token:
+                        await self._ensure_fresh(user_id, creds, force=True)
+                        continue
+                    if response.status == 204:
+                        return None
+
+                    payload = await response.json(content_type=None)
+                    if response.status >= 400:
+                        message = (payload or {}).get('error', {}).get('message', response.reason)
+                        raise CalendarApiError(response.status, message)
+                    return payload
+
+    @staticmethod
+    def _events_path(calendar_id):
+        return f"/calendars/{quote(calendar_id, safe='')}/events"
+
+    async def _insert_event(self, user_id: str, calendar_id, body):
+        return await self._request(
+            user_id, 'POST', self._events_path(calendar_id), params={'fields': INSERT_FIELDS}, body=body,
+            api='events.insert'
+        )
+
+    async def _delete_event(self, user_id: str, calendar_id, event_id):
+        await self._request(
+            user_id, 'DELETE', f"{self._events_path(calendar_id)}/{quote(event_id, safe='')}",
+            api='events.delete'
+        )
+
+    async def _bulk(self, coros, ignore_statuses=()):
+        """Chạy các request đồng thời qua connection pool, giữ thứ tự kết quả"""
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def run(coro):
+            async with semaphore:
+                try:
+                    response = await coro
+                    return {'ok': True, 'id': (response or {}).get('id'), 'error': None}
+                except CalendarApiError as e:
+                    if e.status in ignore_statuses:
+                        return {'ok': True, 'id': None, 'error': None}
+                    return {'ok': False, 'id': None, 'error': str(e)}
+                except Exception as e:
+                    return {'ok': False, 'id': None, 'error': str(e)}
+
+        return await asyncio.gather(*(run(coro) for coro in coros))
+
+    async def add_events(self, events, user_id: str, calendar_id='primary'):
+        try:
+            await self._require_service(user_id)
+        except Exception as e:
+            print(f"Error adding events: {e}")
+            return [{'ok': False, 'id': None, 'error': str(e)} for _ in events]
+
+        return await self._bulk(
+            self._insert_event(
+                user_id,
+                calendar_id,
+                self._build_event_body(event['title'], event['datetime'], event['description'])
+            ) for event in events
+        )
+
+    async def delete_events(self, event_ids, user_id: str, calendar_id='primary'):
+        try:
+            await self._require_service(user_id)
+        except Exception as e:
+            print(f"Error deleting events: {e}")
+            return [{'ok': False, 'id': None, 'error': str(e)} for _ in event_ids]
+
+        return await self._bulk(
+            (self._delete_event(user_id, calendar_id, event_id) for event_id in event_ids),
+            ignore_statuses=(404, 410)
+        )
+
+    async def list_events_page(self, user_id: str, calendar_id='primary', **params):
+        try:
+            return await self._request(
+                user_id, 'GET', self._events_path(calendar_id), params=self._list_params(params),
+                api='events.list'
+            )
+        except CalendarApiError as e:
+            if e.status == 410:
+                raise SyncTokenExpired(str(e))
+            raise
+
+    async def watch_events(self, user_id: str, calendar_id, channel_id, address, token, ttl):
+        body = {
+            'id': channel_id,
+            'type': 'web_hook',
+            'address': address,
+            'token': token,
+            'params': {'ttl': str(ttl)}
+        }
+        return await self._request(
+            user_id, 'POST', f"{self._events_path(calendar_id)}/watch", body=body, api='events.watch'
+        )
+
+    async def stop_channel(self, user_id: str, channel_id, resource_id):
+        await self._request(
+            user_id, 'POST', '/channels/stop', body={'id': channel_id, 'resourceId': resource_id},
+            api='channels.stop'
+        )
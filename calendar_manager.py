@@ -1,49 +1,150 @@
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-import pickle
-import os
+# googleapiclient, google_auth_oauthlib và google.auth.transport được import trong
+# hàm khi dùng lần đầu: khởi động bot không phải chờ các thư viện này
+import csv
+import io
+import json
 import asyncio
 from datetime import datetime
-from config import SCOPES, GOOGLE_CREDENTIALS_FILE
-from aiohttp import ClientSession
+from pytz import utc
+from config import (
+    SCOPES, GOOGLE_CREDENTIALS_FILE, CALENDAR_WORKERS, CALENDAR_PER_USER_LIMIT,
+    TOKEN_REFRESH_BEFORE, TOKEN_REFRESH_CONCURRENCY
+)
+from calendar_executor import CalendarExecutor
+from token_refresher import TokenRefresher
+from utils.ics import ICS_HEADER, ICS_FOOTER, format_ics_event
+
+BATCH_SIZE = 50  # Google khuyến nghị tối đa 50 request mỗi batch
+
+# Profile request tối giản: chỉ lấy các trường bot thực sự dùng (partial response)
+# và để Google lọc sẵn sự kiện sinh nhật từ danh bạ (eventType 'birthday').
+# Đồng bộ tăng dần cũng dùng profile này nên bộ lọc giữ nguyên giữa các lần syncToken.
+EVENT_FIELDS = 'id,status,summary,description,start'
+LIST_PROFILE = {
+    'fields': f'items({EVENT_FIELDS}),nextPageToken,nextSyncToken',
+    'eventTypes': ['default', 'focusTime', 'outOfOffice', 'fromGmail'],
+}
+INSERT_FIELDS = 'id'
+# Xuất file cần thêm thời gian kết thúc, địa điểm và iCalUID
+EXPORT_FIELDS = 'items(id,iCalUID,summary,description,location,start,end),nextPageToken'
+EXPORT_FORMATS = ('ics', 'csv')
+CSV_COLUMNS = ['id', 'title', 'start', 'end', 'description', 'location']
+
+class SyncTokenExpired(Exception):
+    """syncToken không còn hợp lệ, cần đồng bộ lại toàn bộ"""
+
+_discovery_document = None
+
+def calendar_discovery_document():
+    """Discovery document của Calendar v3, chỉ đọc và parse một lần cho cả process"""
+    global _discovery_document
+    if _discovery_document is None:
+        from googleapiclient import discovery_cache
+        from googleapiclient.discovery import build
+
+        doc = discovery_cache.get_static_doc('calendar', 'v3')
+        if doc is None:
+            # Bản googleapiclient không kèm discovery tĩnh: tải một lần rồi dùng lại
+            doc = build('calendar', 'v3', static_discovery=False, cache_discovery=False)._rootDesc
+        _discovery_document = json.loads(doc) if isinstance(doc, str) else doc
+    return _discovery_document
+
+def build_calendar_service(creds):
+    """Tạo Calendar client cho một user từ discovery document dùng chung"""
+    from googleapiclient.discovery import build_from_document
+
+    # googleapiclient đã gửi Accept-Encoding: gzip và User-Agent "(gzip)" nên response được nén
+    return build_from_document(calendar_discovery_document(), credentials=creds)
 
 class CalendarManager:
-    def __init__(self):
+    def __init__(self, credential_store):
+        self.credential_store = credential_store  # Nơi lưu credentials (MongoDB + cache)
         self.services = {}
+        self.credentials = {}  # user_id -> credentials đang được service sử dụng
         self.auth_locks = {}  # Thêm locks để tránh race condition
+        # Thread pool riêng cho Google API, tách khỏi default executor của event loop
+        self.executor = CalendarExecutor(
+            max_workers=CALENDAR_WORKERS,
+            per_user_limit=CALENDAR_PER_USER_LIMIT
+        )
+        # Làm mới token trong nền để lệnh không phải chờ refresh
+        self.token_refresher = TokenRefresher(
+            self,
+            refresh_before=TOKEN_REFRESH_BEFORE,
+            concurrency=TOKEN_REFRESH_CONCURRENCY
+        )
+
+    async def close(self):
+        await self.token_refresher.stop()
+        self.executor.shutdown()
+
+    async def warm_up(self):
+        """Import googleapiclient và parse discovery document trong thread lúc khởi động,
+        để lệnh đầu tiên không phải chờ"""
+        await asyncio.get_event_loop().run_in_executor(None, calendar_discovery_document)
+
+    def _auth_lock(self, user_id: str):
+        if user_id not in self.auth_locks:
+            self.auth_locks[user_id] = asyncio.Lock()
+        return self.auth_locks[user_id]
+
+    async def refresh_in_background(self, user_id: str, creds):
+        """Làm mới token (được TokenRefresher gọi), bỏ qua nếu đã được làm mới ở nơi khác"""
+        async with self._auth_lock(user_id):
+            remaining = (creds.expiry - datetime.utcnow()).total_seconds() if creds.expiry else 0
+            if remaining > self.token_refresher.refresh_before + self.token_refresher.jitter:
+                return
+            await self._refresh_credentials(user_id, creds)
+            await self._save_credentials(user_id, creds)
+
+    async def forget_credentials(self, user_id: str):
+        """Bỏ credentials không còn hiệu lực để lần sau user được hướng dẫn xác thực lại"""
+        self.services.pop(user_id, None)
+        self.credentials.pop(user_id, None)
+        self.token_refresher.untrack(user_id)
+        await self.credential_store.delete(user_id)
+
+    async def _save_credentials(self, user_id: str, creds):
+        await self.credential_store.save(user_id, creds)
+
+    async def _refresh_credentials(self, user_id: str, creds):
+        """Làm mới access token"""
+        from google.auth.transport.requests import Request
+
+        await self.executor.run(user_id, creds.refresh, Request(), api='token.refresh')
+
+    async def _create_service(self, user_id: str, creds):
+        """Tạo đối tượng dùng để gọi API cho user từ credentials"""
+        return await self.executor.run(user_id, build_calendar_service, creds, api='discovery.build')
+
+    @staticmethod
+    def _oauth_flow():
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        return InstalledAppFlow.from_client_secrets_file(
+            GOOGLE_CREDENTIALS_FILE, 
+            SCOPES,
+            redirect_uri='urn:ietf:wg:oauth:2.0:oob'  # Sử dụng OOB flow
+        )
+
+    @staticmethod
+    def get_authorization_url():
+        """URL để user cấp quyền truy cập Google Calendar"""
+        return CalendarManager._oauth_flow().authorization_url()[0]
 
     async def authenticate(self, user_id: str):
         """Xác thực không đồng bộ cho từng user"""
         try:
             # Sử dụng lock để tránh nhiều request cùng lúc
-            if user_id not in self.auth_locks:
-                self.auth_locks[user_id] = asyncio.Lock()
-            
-            async with self.auth_locks[user_id]:
-                creds = None
-                token_path = f'tokens/token_{user_id}.pickle'
-                os.makedirs('tokens', exist_ok=True)
-
-                if os.path.exists(token_path):
-                    with open(token_path, 'rb') as token:
-                        creds = pickle.load(token)
+            async with self._auth_lock(user_id):
+                creds = await self.credential_store.load(user_id)
 
                 if not creds or not creds.valid:
                     if creds and creds.expired and creds.refresh_token:
-                        await asyncio.get_event_loop().run_in_executor(
-                            None, creds.refresh, Request()
-                        )
+                        await self._refresh_credentials(user_id, creds)
                     else:
-                        flow = InstalledAppFlow.from_client_secrets_file(
-                            GOOGLE_CREDENTIALS_FILE, 
-                            SCOPES,
-                            redirect_uri='urn:ietf:wg:oauth:2.0:oob'  # Sử dụng OOB flow
-                        )
-                        
                         # Lấy URL xác thực
-                        auth_url = flow.authorization_url()[0]
+                        auth_url = self.get_authorization_url()
                         
                         # Ném exception với URL xác thực
                         raise Exception(
@@ -54,11 +155,10 @@ class CalendarManager:
                             f"4. Sử dụng lệnh: `B!auth <mã xác thực>`"
                         )
 
-                    with open(token_path, 'wb') as token:
-                        pickle.dump(creds, token)
+                    await self._save_credentials(user_id, creds)
 
-                service = build('calendar', 'v3', credentials=creds)
-                self.services[user_id] = service
+                self.services[user_id] = await self._create_service(user_id, creds)
+                self.credentials[user_id] = creds
                 return True
 
         except Exception as e:
@@ -68,24 +168,20 @@ class CalendarManager:
     async def verify_auth_code(self, user_id: str, auth_code: str):
         """Xác minh mã xác thực từ user"""
         try:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                GOOGLE_CREDENTIALS_FILE,
-                SCOPES,
-                redirect_uri='urn:ietf:wg:oauth:2.0:oob'
-            )
+            flow = self._oauth_flow()
             
-            # Đổi auth code lấy credentials
-            flow.fetch_token(code=auth_code)
+            # Đổi auth code lấy credentials (request mạng, chạy ngoài event loop)
+            await self.executor.run(
+                user_id, lambda: flow.fetch_token(code=auth_code), api='token.exchange'
+            )
             creds = flow.credentials
 
             # Lưu credentials
-            token_path = f'tokens/token_{user_id}.pickle'
-            with open(token_path, 'wb') as token:
-                pickle.dump(creds, token)
+            await self._save_credentials(user_id, creds)
 
             # Tạo service mới
-            service = build('calendar', 'v3', credentials=creds)
-            self.services[user_id] = service
+            self.services[user_id] = await self._create_service(user_id, creds)
+            self.credentials[user_id] = creds
             
             return True
 
@@ -98,31 +194,54 @@ class CalendarManager:
         if user_id not in self.services:
             if not await self.authenticate(user_id):
                 return None
+        if user_id in self.credentials:
+            self.token_refresher.track(user_id, self.credentials[user_id])
         return self.services.get(user_id)
 
+    @staticmethod
+    def _build_event_body(title, datetime_str, description):
+        event_datetime = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M')
+        return {
+            'summary': title,
+            'description': description,
+            'start': {
+                'dateTime': event_datetime.isoformat(),
+                'timeZone': 'Asia/Ho_Chi_Minh',
+            },
+            'end': {
+                'dateTime': event_datetime.isoformat(),
+                'timeZone': 'Asia/Ho_Chi_Minh',
+            }
+        }
+
+    async def _require_service(self, user_id: str):
+        service = await self.get_service(user_id)
+        if not service:
+            raise Exception("Chưa xác thực Google Calendar")
+        return service
+
+    async def _insert_event(self, user_id: str, calendar_id, body):
+        """Gọi events.insert, trả về sự kiện vừa tạo (chỉ gồm id)"""
+        service = await self._require_service(user_id)
+        return await self.executor.run(
+            user_id,
+            service.events().insert(calendarId=calendar_id, body=body, fields=INSERT_FIELDS).execute,
+            api='events.insert'
+        )
+
+    async def _delete_event(self, user_id: str, calendar_id, event_id):
+        """Gọi events.delete"""
+        service = await self._require_service(user_id)
+        await self.executor.run(
+            user_id, service.events().delete(calendarId=calendar_id, eventId=event_id).execute,
+            api='events.delete'
+        )
+
     async def add_event(self, title, datetime_str, description, user_id: str, calendar_id='primary'):
         """Thêm sự kiện với xác thực theo user"""
         try:
-            service = await self.get_service(user_id)
-            if not service:
-                raise Exception("Chưa xác thực Google Calendar")
-
-            event_datetime = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M')
-            event = {
-                'summary': title,
-                'description': description,
-                'start': {
-                    'dateTime': event_datetime.isoformat(),
-                    'timeZone': 'Asia/Ho_Chi_Minh',
-                },
-                'end': {
-                    'dateTime': event_datetime.isoformat(),
-                    'timeZone': 'Asia/Ho_Chi_Minh',
-                }
-            }
-            
-            event = await asyncio.get_event_loop().run_in_executor(
-                None, service.events().insert(calendarId=calendar_id, body=event).execute
+            event = await self._insert_event(
+                user_id, calendar_id, self._build_event_body(title, datetime_str, description)
             )
             return event['id']
             
@@ -133,36 +252,203 @@ class CalendarManager:
     async def delete_event(self, event_id, user_id: str, calendar_id='primary'):
         """Xóa sự kiện với xác thực theo user"""
         try:
-            service = await self.get_service(user_id)
-            if not service:
-                raise Exception("Chưa xác thực Google Calendar")
-
-            await asyncio.get_event_loop().run_in_executor(
-                None, service.events().delete(calendarId=calendar_id, eventId=event_id).execute
-            )
+            await self._delete_event(user_id, calendar_id, event_id)
             return True
         except Exception as e:
             print(f"Error deleting event: {e}")
             return False
 
-    async def list_events(self, user_id: str, calendar_id='primary'):
-        """Liệt kê sự kiện với xác thực theo user"""
-        try:
-            service = await self.get_service(user_id)
-            if not service:
-                raise Exception("Chưa xác thực Google Calendar")
+    @staticmethod
+    def _execute_batch(service, requests, ignore_statuses=()):
+        """Gửi các request theo từng batch HTTP, trả về kết quả theo đúng thứ tự đầu vào.
+
+        Một batch lỗi chỉ làm hỏng các request của batch đó: các batch trước đã được
+        Google áp dụng vẫn giữ kết quả thành công.
+        """
+        from googleapiclient.errors import HttpError
+
+        # Request không nhận được callback (batch lỗi giữa chừng) được coi là thất bại
+        results = [{'ok': False, 'id': None, 'error': 'Không nhận được phản hồi'} for _ in requests]
+
+        def callback(request_id, response, exception):
+            idx = int(request_id)
+            if exception is None:
+                results[idx] = {'ok': True, 'id': (response or {}).get('id'), 'error': None}
+            elif isinstance(exception, HttpError) and exception.resp.status in ignore_statuses:
+                results[idx] = {'ok': True, 'id': None, 'error': None}
+            else:
+                results[idx] = {'ok': False, 'id': None, 'error': str(exception)}
+
+        for start in range(0, len(requests), BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=callback)
+            for idx, request in enumerate(requests[start:start + BATCH_SIZE], start):
+                batch.add(request, request_id=str(idx))
+            try:
+                batch.execute()
+            except Exception as e:
+                print(f"Error executing batch {start // BATCH_SIZE + 1}: {e}")
+                for idx in range(start, min(start + BATCH_SIZE, len(requests))):
+                    results[idx] = {'ok': False, 'id': None, 'error': str(e)}
+        return results
 
-            now = datetime.utcnow().isoformat() + 'Z'
-            events_result = await asyncio.get_event_loop().run_in_executor(
-                None, service.events().list(
+    async def add_events(self, events, user_id: str, calendar_id='primary'):
+        """Thêm nhiều sự kiện bằng batch request.
+
+        `events` là danh sách dict có các khóa title, datetime, description.
+        Trả về danh sách {'ok', 'id', 'error'} theo thứ tự của `events`.
+        """
+        try:
+            service = await self._require_service(user_id)
+            requests = [
+                service.events().insert(
                     calendarId=calendar_id,
-                    timeMin=now,
-                    maxResults=10,
-                    singleEvents=True,
-                    orderBy='startTime'
-                ).execute
+                    body=self._build_event_body(event['title'], event['datetime'], event['description']),
+                    fields=INSERT_FIELDS
+                ) for event in events
+            ]
+            return await self.executor.run(
+                user_id, self._execute_batch, service, requests, api='batch.events.insert'
+            )
+        except Exception as e:
+            print(f"Error adding events: {e}")
+            return [{'ok': False, 'id': None, 'error': str(e)} for _ in events]
+
+    async def delete_events(self, event_ids, user_id: str, calendar_id='primary'):
+        """Xóa nhiều sự kiện bằng batch request, sự kiện đã bị xóa từ trước được coi là thành công"""
+        try:
+            service = await self._require_service(user_id)
+            requests = [
+                service.events().delete(calendarId=calendar_id, eventId=event_id)
+                for event_id in event_ids
+            ]
+            return await self.executor.run(
+                user_id, self._execute_batch, service, requests, (404, 410), api='batch.events.delete'
             )
-            return events_result.get('items', [])
         except Exception as e:
-            print(f"Error listing events: {e}")
-            return []
+            print(f"Error deleting events: {e}")
+            return [{'ok': False, 'id': None, 'error': str(e)} for _ in event_ids]
+
+    async def iter_event_pages(self, user_id: str, calendar_id='primary', page_size=250, **params):
+        """Duyệt sự kiện sắp tới theo từng trang (pageToken), mỗi lần yield một danh sách.
+
+        Trang kế tiếp chỉ được gọi API khi người dùng đọc tới, nên calendar lớn
+        không phải tải hết ngay từ đầu.
+        """
+        params.setdefault('timeMin', datetime.utcnow().isoformat() + 'Z')
+        params.setdefault('singleEvents', True)
+        params.setdefault('orderBy', 'startTime')
+
+        page_token = None
+        while True:
+            result = await self.list_events_page(
+                user_id,
+                calendar_id,
+                maxResults=page_size,
+                pageToken=page_token,
+                **params
+            )
+            yield result.get('items', [])
+
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return
+
+    async def iter_events(self, user_id: str, calendar_id='primary', page_size=250, **params):
+        """Như iter_event_pages nhưng yield từng sự kiện"""
+        async for page in self.iter_event_pages(user_id, calendar_id, page_size, **params):
+            for event in page:
+                yield event
+
+    @staticmethod
+    def _list_params(params):
+        """Thêm profile tối giản vào tham số events.list (tham số truyền vào được ưu tiên)"""
+        return {**LIST_PROFILE, **params}
+
+    async def export_events(self, user_id: str, calendar_id='primary', fmt='ics', page_size=250):
+        """Xuất các sự kiện sắp tới ra .ics hoặc CSV, yield từng đoạn văn bản.
+
+        Mỗi trang API được chuyển thành một đoạn rồi bỏ đi, nên bộ nhớ chỉ phụ
+        thuộc kích thước trang chứ không phụ thuộc số sự kiện của calendar.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+
+        if fmt == 'ics':
+            dtstamp = datetime.utcnow().replace(tzinfo=utc)
+            yield ICS_HEADER
+        else:
+            yield self._csv_rows([CSV_COLUMNS])
+
+        async for page in self.iter_event_pages(user_id, calendar_id, page_size, fields=EXPORT_FIELDS):
+            if fmt == 'ics':
+                yield ''.join(format_ics_event(event, dtstamp) for event in page)
+            else:
+                yield self._csv_rows([
+                    event['id'],
+                    event.get('summary', ''),
+                    event['start'].get('dateTime', event['start'].get('date')),
+                    event.get('end', {}).get('dateTime', event.get('end', {}).get('date', '')),
+                    event.get('description', ''),
+                    event.get('location', '')
+                ] for event in page)
+
+        if fmt == 'ics':
+            yield ICS_FOOTER
+
+    @staticmethod
+    def _csv_rows(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    async def list_events_page(self, user_id: str, calendar_id='primary', **params):
+        """Gọi events.list một lần và trả về kết quả thô (items, nextPageToken, nextSyncToken).
+
+        Ném SyncTokenExpired khi Google trả về 410 cho syncToken đã hết hạn.
+        """
+        from googleapiclient.errors import HttpError
+
+        service = await self._require_service(user_id)
+
+        try:
+            return await self.executor.run(
+                user_id,
+                service.events().list(calendarId=calendar_id, **self._list_params(params)).execute,
+                api='events.list'
+            )
+        except HttpError as e:
+            if e.resp.status == 410:
+                raise SyncTokenExpired(str(e))
+            raise
+
+    async def watch_events(self, user_id: str, calendar_id, channel_id, address, token, ttl):
+        """Đăng ký kênh push notification cho sự kiện của một calendar"""
+        service = await self._require_service(user_id)
+
+        body = {
+            'id': channel_id,
+            'type': 'web_hook',
+            'address': address,
+            'token': token,
+            'params': {'ttl': str(ttl)}
+        }
+        return await self.executor.run(
+            user_id, service.events().watch(calendarId=calendar_id, body=body).execute,
+            api='events.watch'
+        )
+
+    async def stop_channel(self, user_id: str, channel_id, resource_id):
+        """Hủy kênh push notification"""
+        service = await self._require_service(user_id)
+
+        await self.executor.run(
+            user_id, service.channels().stop(body={'id': channel_id, 'resourceId': resource_id}).execute,
+            api='channels.stop'
+        )
+
+def create_calendar_manager(credential_store, backend='googleapiclient'):
+    """Chọn backend gọi Calendar API: 'googleapiclient' (mặc định) hoặc 'aiohttp'"""
+    if backend == 'aiohttp':
+        from calendar_http import AiohttpCalendarManager
+        return AiohttpCalendarManager(credential_store)
+    return CalendarManager(credential_store)
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from datetime import datetime
+from pytz import timezone, utc
+from calendar_manager import SyncTokenExpired
+from utils.cache import TTLCache
+
+LOCAL_TZ = timezone('Asia/Ho_Chi_Minh')
+SYNC_PAGE_SIZE = 250
+STREAM_PAGE_SIZE = 50  # Kích thước trang khi đọc trực tiếp từ API cho list/del
+
+def event_start_timestamp(event):
+    """Timestamp bắt đầu của sự kiện (sự kiện cả ngày tính từ 0h giờ VN)"""
+    start = event.get('start', {})
+    if start.get('dateTime'):
+        return datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00')).timestamp()
+    if start.get('date'):
+        return LOCAL_TZ.localize(datetime.strptime(start['date'], '%Y-%m-%d')).timestamp()
+    return 0.0
+
+class CalendarMirror:
+    """Bản sao cục bộ các sự kiện của một calendar"""
+    __slots__ = ('events', 'sync_token', 'synced_at', 'lock')
+
+    def __init__(self):
+        self.events = {}  # event_id -> (start_ts, event)
+        self.sync_token = None
+        self.synced_at = 0.0
+        self.lock = asyncio.Lock()
+
+class CalendarSync:
+    """Đồng bộ tăng dần qua syncToken và phục vụ list/del từ bản sao cục bộ.
+
+    Lần đầu đồng bộ toàn bộ các sự kiện sắp tới, các lần sau chỉ lấy phần
+    thay đổi; khi Google trả về 410 thì đồng bộ lại từ đầu. Bản sao được
+    coi là còn mới trong `max_age` giây, trong thời gian đó không gọi API.
+
+    Mọi thay đổi lấy được, dù lần đồng bộ do list/del hay webhook khởi động,
+    đều được chuyển cho `on_changes(changed)` (lập lịch lại nhắc nhở): syncToken
+    đã tiến lên thì lần đồng bộ sau không thấy lại các thay đổi đó nữa.
+    """
+
+    def __init__(self, calendar_manager, max_age=60, max_mirrors=1000, on_changes=None):
+        self.calendar_manager = calendar_manager
+        self.on_changes = on_changes
+        self.max_age = max_age
+        self._mirrors = TTLCache(maxsize=max_mirrors, ttl=24 * 3600)
+        self._sync_tasks = {}  # (user_id, calendar_id) -> task đồng bộ chạy nền
+
+    @property
+    def cache(self):
+        """Các bản sao calendar đang giữ trong bộ nhớ"""
+        return self._mirrors
+
+    def _mirror(self, user_id, calendar_id):
+        key = (user_id, calendar_id)
+        mirror = self._mirrors.get(key)
+        if mirror is None:
+            mirror = CalendarMirror()
+            self._mirrors.set(key, mirror)
+        return mirror
+
+    def _start_sync(self, user_id: str, calendar_id):
+        """Đồng bộ bản sao ở nền, mỗi calendar chỉ có một task"""
+        key = (user_id, calendar_id)
+        task = self._sync_tasks.get(key)
+        if task is None or task.done():
+            task = asyncio.get_event_loop().create_task(self.sync(user_id, calendar_id))
+            task.add_done_callback(lambda done: self._sync_finished(key, done))
+            self._sync_tasks[key] = task
+        return task
+
+    def _sync_finished(self, key, task):
+        if self._sync_tasks.get(key) is task:
+            del self._sync_tasks[key]
+        if not task.cancelled() and task.exception():
+            print(f"Error syncing events: {task.exception()}")
+
+    async def sync(self, user_id: str, calendar_id='primary', force=False):
+        """Đồng bộ bản sao, trả về danh sách sự kiện thay đổi (kể cả sự kiện bị hủy)"""
+        mirror = self._mirror(user_id, calendar_id)
+        async with mirror.lock:
+            if not force and time.time() - mirror.synced_at < self.max_age:
+                return []
+            try:
+                changed = await self._sync_locked(mirror, user_id, calendar_id)
+            except SyncTokenExpired:
+                print(f"↪️ syncToken hết hạn cho user {user_id}, đồng bộ lại toàn bộ")
+                mirror.events.clear()
+                mirror.sync_token = None
+                changed = await self._sync_locked(mirror, user_id, calendar_id)
+
+            # Vẫn giữ lock để các thay đổi của cùng calendar được áp dụng theo đúng thứ tự
+            if changed and self.on_changes:
+                try:
+                    await self.on_changes(changed)
+                except Exception as e:
+                    print(f"❌ Lỗi khi áp dụng thay đổi từ Google Calendar: {str(e)}")
+            return changed
+
+    async def _sync_locked(self, mirror, user_id, calendar_id):
+        if mirror.sync_token:
+            params = {'syncToken': mirror.sync_token}
+        else:
+            # Đồng bộ toàn bộ: chỉ lấy các sự kiện từ thời điểm hiện tại
+            params = {'timeMin': datetime.now(utc).isoformat().replace('+00:00', 'Z')}
+
+        changed = []
+        page_token = None
+        while True:
+            result = await self.calendar_manager.list_events_page(
+                user_id,
+                calendar_id,
+                singleEvents=True,
+                maxResults=SYNC_PAGE_SIZE,
+                pageToken=page_token,
+                **params
+            )
+            for event in result.get('items', []):
+                if event.get('status') == 'cancelled':
+                    mirror.events.pop(event['id'], None)
+                else:
+                    mirror.events[event['id']] = (event_start_timestamp(event), event)
+                changed.append(event)
+
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                mirror.sync_token = result.get('nextSyncToken')
+                break
+
+        mirror.synced_at = time.time()
+        return changed
+
+    async def list_upcoming(self, user_id: str, calendar_id='primary', limit=10):
+        """Các sự kiện sắp tới, sắp xếp theo thời gian bắt đầu, lấy từ bản sao"""
+        try:
+            await self.sync(user_id, calendar_id)
+        except Exception as e:
+            print(f"Error syncing events: {e}")
+
+        mirror = self._mirror(user_id, calendar_id)
+        now = time.time()
+        upcoming = sorted(
+            (item for item in mirror.events.values() if item[0] >= now),
+            key=lambda item: item[0]
+        )
+        if limit is not None:
+            upcoming = upcoming[:limit]
+        return [event for _, event in upcoming]
+
+    async def iter_upcoming(self, user_id: str, calendar_id='primary', page_size=STREAM_PAGE_SIZE):
+        """Duyệt các sự kiện sắp tới theo thời gian bắt đầu.
+
+        Calendar đã có bản sao thì đọc từ bản sao (sau khi đồng bộ tăng dần).
+        Chưa có thì bắt đầu đồng bộ ở nền và trong lúc chờ đọc từng trang từ API;
+        khi đồng bộ xong, các trang sau (và các lần list/del sau) đọc từ bản sao.
+        """
+        mirror = self._mirrors.get((user_id, calendar_id))
+        if mirror is not None and mirror.sync_token is not None:
+            for event in await self.list_upcoming(user_id, calendar_id, limit=None):
+                yield event
+            return
+
+        task = self._start_sync(user_id, calendar_id)
+        seen = set()
+        last_start = time.time()
+        pages = self.calendar_manager.iter_event_pages(user_id, calendar_id, page_size)
+        try:
+            async for page in pages:
+                for event in page:
+                    seen.add(event['id'])
+                    last_start = event_start_timestamp(event)
+                    yield event
+                # Đồng bộ lỗi thì tiếp tục đọc từ API
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    break
+            else:
+                return
+        finally:
+            await pages.aclose()
+
+        # Phần còn lại lấy từ bản sao, tiếp nối sau sự kiện cuối cùng đã trả về
+        mirror = self._mirror(user_id, calendar_id)
+        remaining = sorted(
+            (item for item in mirror.events.values() if item[0] >= last_start and item[1]['id'] not in seen),
+            key=lambda item: item[0]
+        )
+        for _, event in remaining:
+            yield event
+
+    def mark_stale(self, user_id: str, calendar_id='primary'):
+        """Buộc lần đọc kế tiếp đồng bộ tăng dần (sau khi bot tự thêm sự kiện)"""
+        mirror = self._mirrors.get((user_id, calendar_id))
+        if mirror:
+            mirror.synced_at = 0.0
+
+    def discard(self, user_id: str, calendar_id, event_ids):
+        """Bỏ các sự kiện vừa bị xóa khỏi bản sao"""
+        mirror = self._mirrors.get((user_id, calendar_id))
+        if mirror:
+            for event_id in event_ids:
+                mirror.events.pop(event_id, None)
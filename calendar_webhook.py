@@ -0,0 +1,188 @@
+import asyncio
+import hmac
+import time
+import uuid
+from aiohttp import web
+
+NOTIFICATION_PATH = '/calendar/notifications'
+
+class CalendarWebhook:
+    """Nhận push notification của Google Calendar qua aiohttp.
+
+    Mỗi calendar của user được đăng ký một kênh watch, kênh được gia hạn
+    trước khi hết hạn. Khi có thông báo, bản sao sự kiện được đồng bộ tăng
+    dần và các nhắc nhở bị ảnh hưởng được lập lịch lại.
+
+    Khi chạy nhiều process, mọi process đều đăng ký kênh vào MongoDB, chỉ
+    process `serve=True` (giữ shard 0) mở HTTP server và gia hạn kênh.
+    """
+
+    def __init__(self, bot, public_url, token='', host='0.0.0.0', port=8080,
+                 ttl=7 * 24 * 3600, renew_before=3600, renew_interval=600, serve=True):
+        self.bot = bot
+        self.serve = serve
+        self.public_url = public_url
+        self.token = token
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.renew_before = renew_before
+        self.renew_interval = renew_interval
+        self.channels = {}  # channel_id -> dict kênh
+        self._by_calendar = {}  # (user_id, calendar_id) -> channel_id
+        self._runner = None
+        self._renew_task = None
+        self._tasks = set()
+        self._pending = set()  # Calendar đang được đăng ký
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post(NOTIFICATION_PATH, self._handle_request)
+        return app
+
+    async def start(self):
+        """Khôi phục các kênh đã đăng ký, mở HTTP server và vòng gia hạn"""
+        if not self.serve:
+            return
+        for channel in await self.bot.db_manager.get_watch_channels():
+            self._track(channel)
+
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self._renew_task = asyncio.get_event_loop().create_task(self._renew_loop())
+        print(f"✓ Webhook Google Calendar đang lắng nghe tại {self.host}:{self.port}{NOTIFICATION_PATH}")
+
+    async def stop(self):
+        if self._renew_task:
+            self._renew_task.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def _track(self, channel):
+        self.channels[channel['channel_id']] = channel
+        self._by_calendar[(channel['user_id'], channel['calendar_id'])] = channel['channel_id']
+
+    def _untrack(self, channel):
+        self.channels.pop(channel['channel_id'], None)
+        key = (channel['user_id'], channel['calendar_id'])
+        if self._by_calendar.get(key) == channel['channel_id']:
+            del self._by_calendar[key]
+
+    async def watch(self, user_id: str, calendar_id):
+        """Đăng ký kênh watch cho calendar nếu chưa có"""
+        if not calendar_id:
+            return None
+        channel = self.channels.get(self._by_calendar.get((user_id, calendar_id)))
+        if channel and channel['expiration'] > time.time():
+            return channel
+        # Kênh có thể đã được process khác đăng ký (hoặc gia hạn)
+        channel = await self.bot.db_manager.find_watch_channel(user_id, calendar_id, time.time())
+        if channel:
+            self._track(channel)
+            return channel
+        return await self._register(user_id, calendar_id)
+
+    def watch_in_background(self, user_id: str, calendar_id):
+        key = (user_id, calendar_id)
+        channel = self.channels.get(self._by_calendar.get(key))
+        if not calendar_id or (channel and channel['expiration'] > time.time()) or key in self._pending:
+            return
+        self._pending.add(key)
+        self._spawn(self._watch_pending(key))
+
+    async def _watch_pending(self, key):
+        try:
+            await self.watch(*key)
+        except Exception as e:
+            print(f"❌ Không thể đăng ký kênh watch cho user {key[0]}: {str(e)}")
+        finally:
+            self._pending.discard(key)
+
+    async def _register(self, user_id, calendar_id):
+        channel_id = str(uuid.uuid4())
+        response = await self.bot.calendar_manager.watch_events(
+            user_id, calendar_id, channel_id, self.public_url, self.token, self.ttl
+        )
+        channel = {
+            'channel_id': channel_id,
+            'resource_id': response['resourceId'],
+            'user_id': user_id,
+            'calendar_id': calendar_id,
+            'expiration': int(response.get('expiration', 0)) / 1000 or time.time() + self.ttl
+        }
+        self._track(channel)
+        await self.bot.db_manager.save_watch_channel(channel)
+        print(f"✓ Đã đăng ký kênh watch cho calendar của user {user_id}")
+        return channel
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                # Gia hạn cả các kênh do process khác đăng ký
+                for channel in await self.bot.db_manager.get_watch_channels():
+                    if channel['channel_id'] not in self.channels:
+                        self._track(channel)
+            except Exception as e:
+                print(f"❌ Không thể đọc danh sách kênh watch: {str(e)}")
+            deadline = time.time() + self.renew_before
+            for channel in [c for c in self.channels.values() if c['expiration'] <= deadline]:
+                await self.renew(channel)
+
+    async def renew(self, channel):
+        """Đăng ký kênh mới rồi hủy kênh cũ để không bỏ lỡ thông báo"""
+        try:
+            self._untrack(channel)
+            await self._register(channel['user_id'], channel['calendar_id'])
+        except Exception as e:
+            print(f"❌ Không thể gia hạn kênh watch {channel['channel_id']}: {str(e)}")
+            if channel['expiration'] > time.time():
+                self._track(channel)
+            return
+
+        try:
+            await self.bot.calendar_manager.stop_channel(
+                channel['user_id'], channel['channel_id'], channel['resource_id']
+            )
+        except Exception as e:
+            print(f"Không thể hủy kênh watch cũ {channel['channel_id']}: {str(e)}")
+        await self.bot.db_manager.delete_watch_channel(channel['channel_id'])
+
+    async def _handle_request(self, request):
+        channel_id = request.headers.get('X-Goog-Channel-ID')
+        token = request.headers.get('X-Goog-Channel-Token', '')
+        if channel_id and channel_id not in self.channels and hmac.compare_digest(token, self.token or ''):
+            # Kênh do process khác đăng ký sau khi webhook khởi động
+            channel = await self.bot.db_manager.get_watch_channel(channel_id)
+            if channel:
+                self._track(channel)
+        accepted = self.accept_notification(
+            channel_id,
+            request.headers.get('X-Goog-Resource-State'),
+            token
+        )
+        # Trả lời ngay, việc đồng bộ chạy nền để Google không gửi lại thông báo
+        return web.Response(status=200 if accepted else 404)
+
+    def accept_notification(self, channel_id, resource_state, token=''):
+        """Kiểm tra thông báo và lên lịch làm mới, trả về False nếu không nhận ra kênh"""
+        channel = self.channels.get(channel_id)
+        if channel is None or not hmac.compare_digest(token or '', self.token or ''):
+            return False
+        if resource_state != 'sync':  # 'sync' chỉ là thông báo xác nhận khi đăng ký
+            self._spawn(self.refresh(channel))
+        return True
+
+    async def refresh(self, channel):
+        """Đồng bộ tăng dần calendar và lập lịch lại các nhắc nhở bị ảnh hưởng"""
+        try:
+            # Các thay đổi được CalendarSync chuyển cho scheduler (on_changes)
+            await self.bot.calendar_sync.sync(channel['user_id'], channel['calendar_id'], force=True)
+        except Exception as e:
+            print(f"❌ Lỗi khi xử lý thông báo từ Google Calendar: {str(e)}")
+
+    def _spawn(self, coro):
+        task = asyncio.get_event_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
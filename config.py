@@ -9,3 +9,82 @@ CALENDAR_ID = os.getenv('CALENDAR_ID', 'primary')  # Sử dụng 'primary' làm
 GOOGLE_CREDENTIALS_FILE = os.path.join(os.path.dirname(__file__), 'credentials.json')
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 COMMAND_PREFIX = ['B!', 'b!']
+
+# Connection pool MongoDB
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '50'))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '5'))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', '60000'))
+MONGODB_TIMEOUT_MS = int(os.getenv('MONGODB_TIMEOUT_MS', '5000'))  # Giới hạn thời gian chờ mỗi thao tác
+
+# Cache quyền sử dụng bot
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '10000'))
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '300'))  # Giây, cho user đã được cấp quyền
+AUTH_CACHE_NEGATIVE_TTL = int(os.getenv('AUTH_CACHE_NEGATIVE_TTL', '60'))  # Giây, cho user chưa có quyền
+AUTH_CHANGE_STREAM = os.getenv('AUTH_CHANGE_STREAM', 'false').lower() == 'true'  # Cần MongoDB replica set
+
+# Cache cài đặt của user (Calendar ID đã giải mã...)
+SETTINGS_CACHE_SIZE = int(os.getenv('SETTINGS_CACHE_SIZE', '10000'))
+SETTINGS_CACHE_TTL = int(os.getenv('SETTINGS_CACHE_TTL', '600'))  # Giây, cho user đã có cài đặt
+SETTINGS_CACHE_NEGATIVE_TTL = int(os.getenv('SETTINGS_CACHE_NEGATIVE_TTL', '60'))  # Giây, cho user chưa cài đặt
+
+# Chế độ tiết kiệm bộ nhớ: không tải và cache toàn bộ member của các server,
+# chỉ giữ member mà bot tương tác và tra cứu member khác khi cần
+LOW_MEMORY_MEMBERS = os.getenv('LOW_MEMORY_MEMBERS', 'false').lower() == 'true'
+MEMBER_CACHE_SIZE = int(os.getenv('MEMBER_CACHE_SIZE', '5000'))
+MEMBER_CACHE_TTL = int(os.getenv('MEMBER_CACHE_TTL', '600'))  # Giây, cho member đã tìm thấy
+MEMBER_CACHE_NEGATIVE_TTL = int(os.getenv('MEMBER_CACHE_NEGATIVE_TTL', '60'))  # Giây, cho user không ở trong server
+
+# Hàng đợi gửi nhắc nhở (giới hạn tốc độ theo Discord)
+DISPATCH_WORKERS = int(os.getenv('DISPATCH_WORKERS', '4'))
+DISPATCH_GLOBAL_RATE = int(os.getenv('DISPATCH_GLOBAL_RATE', '45'))  # Request/giây, Discord cho phép 50
+DISPATCH_ROUTE_RATE = int(os.getenv('DISPATCH_ROUTE_RATE', '5'))  # Số tin nhắn mỗi người nhận...
+DISPATCH_ROUTE_PERIOD = int(os.getenv('DISPATCH_ROUTE_PERIOD', '5'))  # ...trong khoảng giây này
+
+# Bản sao cục bộ các sự kiện Google Calendar
+SYNC_MAX_AGE = int(os.getenv('SYNC_MAX_AGE', '60'))  # Giây trước khi đồng bộ tăng dần lại
+SYNC_MAX_MIRRORS = int(os.getenv('SYNC_MAX_MIRRORS', '1000'))  # Số calendar giữ trong bộ nhớ
+
+# Nhận push notification từ Google Calendar (tùy chọn)
+WEBHOOK_ENABLED = os.getenv('WEBHOOK_ENABLED', 'false').lower() == 'true'
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_PUBLIC_URL = os.getenv('WEBHOOK_PUBLIC_URL')  # URL HTTPS công khai, ví dụ https://bot.example.com/calendar/notifications
+WEBHOOK_TOKEN = os.getenv('WEBHOOK_TOKEN', '')  # Google gửi lại trong header X-Goog-Channel-Token
+WATCH_TTL = int(os.getenv('WATCH_TTL', str(7 * 24 * 3600)))  # Giây, Google giới hạn tối đa khoảng 7 ngày
+WATCH_RENEW_BEFORE = int(os.getenv('WATCH_RENEW_BEFORE', '3600'))  # Gia hạn trước khi hết hạn bao nhiêu giây
+
+# Chạy nhiều bản sao bot: mỗi lần nhắc/dọn dẹp được claim qua lease trong MongoDB
+REMINDER_LEASES = os.getenv('REMINDER_LEASES', 'false').lower() == 'true'
+REMINDER_LEASE_SECONDS = int(os.getenv('REMINDER_LEASE_SECONDS', '30'))  # Thời hạn lease trước khi bản sao khác tiếp quản
+REMINDER_REFRESH_INTERVAL = int(os.getenv('REMINDER_REFRESH_INTERVAL', '30'))  # Giây giữa các lần đọc nhắc nhở mới từ MongoDB
+
+# HTTP server nội bộ xuất metrics (/metrics) và trạng thái (/healthz)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))  # Khi chạy nhiều process: cộng thêm shard đầu tiên của process
+
+# Thread pool cho các lời gọi Google Calendar API
+CALENDAR_WORKERS = int(os.getenv('CALENDAR_WORKERS', '16'))
+CALENDAR_PER_USER_LIMIT = int(os.getenv('CALENDAR_PER_USER_LIMIT', '4'))  # Số lời gọi đồng thời tối đa của một user
+
+# Backend gọi Calendar API: 'googleapiclient' (thread pool) hoặc 'aiohttp' (bất đồng bộ hoàn toàn)
+CALENDAR_BACKEND = os.getenv('CALENDAR_BACKEND', 'googleapiclient')
+CALENDAR_HTTP_POOL_SIZE = int(os.getenv('CALENDAR_HTTP_POOL_SIZE', '100'))  # Số kết nối keep-alive tối đa
+
+# Làm mới OAuth token trong nền
+TOKEN_REFRESH_BEFORE = int(os.getenv('TOKEN_REFRESH_BEFORE', '300'))  # Giây trước khi token hết hạn
+TOKEN_REFRESH_CONCURRENCY = int(os.getenv('TOKEN_REFRESH_CONCURRENCY', '4'))
+
+# Import sự kiện từ file .ics
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '100'))  # Số sự kiện mỗi lô gửi lên Google
+IMPORT_CONCURRENCY = int(os.getenv('IMPORT_CONCURRENCY', '4'))  # Số lô xử lý đồng thời
+
+# Chia shard: SHARD_COUNT=0 để Discord đề xuất số shard.
+# SHARD_IDS (ví dụ "0,1") giới hạn các shard mà process này giữ, SHARD_PROCESSES dùng cho launcher.py
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id.strip()] or None
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', '1'))
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    raise ValueError("SHARD_IDS cần đi kèm SHARD_COUNT (tổng số shard của bot)")
+if SHARD_IDS is not None and any(shard_id < 0 or shard_id >= SHARD_COUNT for shard_id in SHARD_IDS):
+    raise ValueError(f"SHARD_IDS phải nằm trong khoảng 0..{SHARD_COUNT - 1} (SHARD_COUNT={SHARD_COUNT})")
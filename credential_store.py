@@ -0,0 +1,53 @@
+import json
+from config import SCOPES
+from utils.cache import TTLCache
+
+class CredentialStore:
+    """Lưu credentials Google của từng user trong MongoDB (đã mã hóa).
+
+    Có cache LRU trong bộ nhớ phía trước nên các lệnh không phải đọc
+    database hay giải mã lại mỗi lần, và nhiều bản sao bot có thể dùng
+    chung cùng một nơi lưu trữ.
+    """
+
+    def __init__(self, db_manager, maxsize=1000, ttl=3600):
+        self.collection = db_manager.credentials
+        self.encryption = db_manager.encryption
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def cache(self):
+        """Cache credentials đã giải mã (dùng cho metrics)"""
+        return self._cache
+
+    async def load(self, user_id: str):
+        """Lấy credentials của user, trả về None nếu chưa xác thực"""
+        creds = self._cache.get(user_id)
+        if creds is not None:
+            return creds
+
+        document = await self.collection.find_one({'user_id': user_id}, {'credentials': 1})
+        if not document:
+            return None
+
+        decrypted = self.encryption.decrypt(document['credentials'])
+        if not decrypted:
+            return None
+        from google.oauth2.credentials import Credentials  # Chỉ import khi cần đọc credentials lần đầu
+
+        creds = Credentials.from_authorized_user_info(json.loads(decrypted), SCOPES)
+        self._cache.set(user_id, creds)
+        return creds
+
+    async def save(self, user_id: str, creds):
+        """Mã hóa và lưu credentials (gọi sau khi xác thực hoặc làm mới token)"""
+        await self.collection.update_one(
+            {'user_id': user_id},
+            {'$set': {'credentials': self.encryption.encrypt(creds.to_json())}},
+            upsert=True
+        )
+        self._cache.set(user_id, creds)
+
+    async def delete(self, user_id: str):
+        self._cache.invalidate(user_id)
+        return await self.collection.delete_one({'user_id': user_id})
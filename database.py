@@ -1,19 +1,122 @@
-from pymongo import MongoClient
-from config import MONGODB_URI
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import OperationFailure
+from config import (
+    MONGODB_URI, MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE,
+    MONGODB_MAX_IDLE_TIME_MS, MONGODB_TIMEOUT_MS,
+    AUTH_CACHE_SIZE, AUTH_CACHE_TTL, AUTH_CACHE_NEGATIVE_TTL,
+    SETTINGS_CACHE_SIZE, SETTINGS_CACHE_TTL, SETTINGS_CACHE_NEGATIVE_TTL
+)
+from utils.cache import TTLCache
 from utils.encryption import EncryptionManager
+from utils.metrics import MONGO_COMMANDS, MONGO_SECONDS
+
+# Các phiên bản schema, mỗi phiên bản là danh sách index cần tạo: (collection, keys, options).
+# Chỉ thêm phiên bản mới vào cuối, không sửa phiên bản đã phát hành.
+SCHEMA_VERSIONS = [
+    # v1: index cho các truy vấn nóng
+    [
+        ('events', 'event_id', {'unique': True}),
+        ('events', 'datetime', {}),
+        ('events', [('created_by', 1), ('datetime', 1)], {}),  # Sự kiện theo user và khoảng thời gian
+        ('user_settings', 'user_id', {'unique': True}),
+        ('authorized_users', 'user_id', {'unique': True}),
+        ('credentials', 'user_id', {'unique': True}),
+        ('reminders', 'event_id', {'unique': True}),
+        ('reminders', 'cleanup_at', {}),
+        ('watch_channels', 'channel_id', {'unique': True}),
+    ],
+    # v2: các bản sao bot đọc nhắc nhở vừa thay đổi khi làm mới định kỳ
+    [
+        ('reminders', 'updated_at', {}),
+    ],
+    # v3: process bất kỳ tìm kênh watch đã đăng ký cho calendar của user
+    [
+        ('watch_channels', [('user_id', 1), ('calendar_id', 1)], {}),
+    ],
+]
+SCHEMA_VERSION = len(SCHEMA_VERSIONS)
+
+ENCRYPTED_SETTINGS = ('calendar_id',)  # Các cài đặt được mã hóa trong user_settings
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Ghi số lệnh và thời gian của từng loại lệnh MongoDB (find, update, insert...)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGO_COMMANDS.inc(command=event.command_name, status='ok')
+
+    def failed(self, event):
+        MONGO_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGO_COMMANDS.inc(command=event.command_name, status='error')
 
 class DatabaseManager:
-    def __init__(self):
-        self.client = MongoClient(MONGODB_URI)
-        self.db = self.client.calendar_bot
+    def __init__(self, db_name='calendar_bot'):
+        # Client bất đồng bộ: không chặn event loop khi Mongo phản hồi chậm.
+        # Kết nối được mở lười ở lần truy vấn đầu tiên.
+        self.client = AsyncIOMotorClient(
+            MONGODB_URI,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=MONGODB_TIMEOUT_MS,
+            connectTimeoutMS=MONGODB_TIMEOUT_MS,
+            socketTimeoutMS=MONGODB_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGODB_TIMEOUT_MS,
+            retryWrites=True,
+            event_listeners=[MongoCommandMetrics()]
+        )
+        self.db = self.client[db_name]
         self.events = self.db.events
+        self.reminders = self.db.reminders  # Lịch nhắc nhở đang chờ, dùng để khôi phục khi khởi động lại
+        self.watch_channels = self.db.watch_channels  # Kênh push notification của Google Calendar
+        self.credentials = self.db.credentials  # Credentials Google của user (đã mã hóa)
         self.user_settings = self.db.user_settings
         self.encryption = EncryptionManager()
         self.authorized_users = self.db.authorized_users  # Thêm collection mới
+        self.meta = self.db.meta  # Thông tin nội bộ (phiên bản schema)
+        self.auth_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+        self.settings_cache = TTLCache(maxsize=SETTINGS_CACHE_SIZE, ttl=SETTINGS_CACHE_TTL)
+
+    def close(self):
+        """Đóng connection pool"""
+        self.client.close()
 
-    def save_event(self, event_id, title, datetime_str, description, user_id=None):
+    async def ensure_schema(self):
+        """Tạo các index còn thiếu theo phiên bản schema (idempotent, chạy khi khởi động).
+
+        Phiên bản đã áp dụng được lưu trong collection meta nên các lần khởi
+        động sau chỉ tốn một truy vấn. Trả về False nếu không áp dụng được.
+        """
+        try:
+            document = await self.meta.find_one({'_id': 'schema'})
+            current = document.get('version', 0) if document else 0
+            if current >= SCHEMA_VERSION:
+                return True
+
+            for version in range(current, SCHEMA_VERSION):
+                for collection, keys, options in SCHEMA_VERSIONS[version]:
+                    await self.db[collection].create_index(keys, **options)
+                await self.meta.update_one(
+                    {'_id': 'schema'},
+                    {'$set': {'version': version + 1}},
+                    upsert=True
+                )
+                print(f"✓ Đã nâng schema database lên phiên bản {version + 1}")
+            return True
+
+        except Exception as e:
+            # Ví dụ dữ liệu cũ bị trùng khóa nên không tạo được unique index
+            print(f"❌ Lỗi khi tạo index cho database: {str(e)}")
+            return False
+
+    async def save_event(self, event_id, title, datetime_str, description, user_id=None):
         """Lưu sự kiện với thông tin người tạo"""
-        return self.events.update_one(
+        return await self.events.update_one(
             {'event_id': event_id},
             {
                 '$set': {
@@ -26,50 +129,283 @@ class DatabaseManager:
             upsert=True
         )
 
-    def delete_event(self, event_id):
-        return self.events.delete_one({'event_id': event_id})
+    async def save_events(self, events, user_id=None):
+        """Lưu nhiều sự kiện bằng một bulk_write.
+
+        `events` là danh sách dict có các khóa event_id, title, datetime, description.
+        """
+        if not events:
+            return None
+        return await self.events.bulk_write([
+            UpdateOne(
+                {'event_id': event['event_id']},
+                {
+                    '$set': {
+                        'title': event['title'],
+                        'datetime': event['datetime'],
+                        'description': event['description'],
+                        'created_by': user_id
+                    }
+                },
+                upsert=True
+            ) for event in events
+        ], ordered=False)
+
+    async def find_existing_events(self, user_id, keys):
+        """Các cặp (title, datetime) trong `keys` mà user đã có sự kiện (dùng index created_by + datetime)"""
+        cursor = self.events.find(
+            {'created_by': user_id, 'datetime': {'$in': list({datetime_str for _, datetime_str in keys})}},
+            {'title': 1, 'datetime': 1, '_id': 0}
+        )
+        return {(event.get('title'), event.get('datetime')) async for event in cursor}
+
+    async def delete_event(self, event_id):
+        return await self.events.delete_one({'event_id': event_id})
 
-    def get_event(self, event_id):
-        return self.events.find_one({'event_id': event_id})
+    async def update_event(self, event_id, **fields):
+        return await self.events.update_one({'event_id': event_id}, {'$set': fields})
 
-    def get_event_creator(self, event_id):
+    async def delete_events(self, event_ids):
+        return await self.events.delete_many({'event_id': {'$in': list(event_ids)}})
+
+    async def get_event(self, event_id):
+        return await self.events.find_one({'event_id': event_id})
+
+    async def get_event_creator(self, event_id):
         """Lấy ID người tạo sự kiện"""
-        event = self.events.find_one({'event_id': event_id})
+        event = await self.events.find_one(
+            {'event_id': event_id},
+            {'created_by': 1, '_id': 0}
+        )
         return event.get('created_by') if event else None
 
-    def save_user_calendar(self, user_id: str, calendar_id: str):
+    async def save_reminder(self, reminder: dict):
+        """Lưu (hoặc cập nhật) lịch nhắc nhở của một sự kiện.
+
+        Dùng $set trên các trường lịch để giữ lại `sent` và `leases` khi lập lịch lại.
+        """
+        return await self.reminders.update_one(
+            {'event_id': reminder['event_id']},
+            {'$set': reminder},
+            upsert=True
+        )
+
+    async def save_reminders(self, reminders):
+        """Lưu nhiều lịch nhắc nhở bằng một bulk_write"""
+        if not reminders:
+            return None
+        return await self.reminders.bulk_write([
+            UpdateOne({'event_id': reminder['event_id']}, {'$set': reminder}, upsert=True)
+            for reminder in reminders
+        ], ordered=False)
+
+    async def get_reminders(self, event_ids):
+        """Lấy lịch nhắc nhở của các sự kiện (mọi shard)"""
+        cursor = self.reminders.find({'event_id': {'$in': list(event_ids)}}, {'_id': 0})
+        return await cursor.to_list(length=None)
+
+    async def cancel_reminder(self, event_id, updated_at):
+        """Đánh dấu nhắc nhở đã hủy để process sở hữu bỏ khỏi engine rồi xóa khi làm mới"""
+        return await self.reminders.update_one(
+            {'event_id': event_id},
+            {'$set': {'cancelled': True, 'updated_at': updated_at}}
+        )
+
+    async def delete_reminder(self, event_id):
+        return await self.reminders.delete_one({'event_id': event_id})
+
+    async def delete_reminders(self, event_ids):
+        return await self.reminders.delete_many({'event_id': {'$in': list(event_ids)}})
+
+    async def get_pending_reminders(self, now, shard_ids=None, shard_count=None, updated_since=None):
+        """Lấy các lịch nhắc nhở chưa dọn dẹp bằng một truy vấn theo index cleanup_at.
+
+        Khi chạy nhiều process, chỉ lấy nhắc nhở của các shard `shard_ids`
+        (shard_id = shard_key % shard_count, giống cách Discord chia guild).
+        `updated_since` giới hạn ở các nhắc nhở vừa được lưu (dùng index updated_at).
+        """
+        query = {'cleanup_at': {'$gt': now}}
+        if updated_since is not None:
+            query['updated_at'] = {'$gte': updated_since}
+        if shard_ids is not None and shard_count:
+            query['$expr'] = {
+                '$in': [{'$mod': [{'$ifNull': ['$shard_key', 0]}, shard_count]}, list(shard_ids)]
+            }
+        cursor = self.reminders.find(
+            query,
+            {'_id': 0},
+            batch_size=10000
+        )
+        return await cursor.to_list(length=None)
+
+    async def claim_reminder_job(self, event_id, cleanup_at, job, owner, now, lease_until):
+        """Giành lease cho một job của nhắc nhở (nguyên tử), trả về None nếu không giành được.
+
+        Chỉ thành công khi nhắc nhở vẫn đúng lịch (`cleanup_at`), job chưa xong
+        và chưa có lease còn hạn của bản sao khác.
+        """
+        return await self.reminders.find_one_and_update(
+            {
+                'event_id': event_id,
+                'cleanup_at': cleanup_at,
+                'sent': {'$ne': job},
+                '$or': [
+                    {f'leases.{job}': {'$exists': False}},
+                    {f'leases.{job}.until': {'$lte': now}},
+                    {f'leases.{job}.owner': owner}
+                ]
+            },
+            {'$set': {f'leases.{job}': {'owner': owner, 'until': lease_until}}},
+            projection={'_id': 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def get_reminder_state(self, event_id):
+        return await self.reminders.find_one(
+            {'event_id': event_id},
+            {'cleanup_at': 1, 'sent': 1, 'leases': 1, '_id': 0}
+        )
+
+    async def complete_reminder_job(self, event_id, job):
+        """Ghi nhận job đã xong (idempotent) và bỏ lease.
+
+        Không lọc theo chủ lease: lease có thể đã hết hạn và bị bản sao khác
+        tiếp quản trong lúc gửi, nhưng lần gửi này vẫn phải được ghi nhận.
+        """
+        return await self.reminders.update_one(
+            {'event_id': event_id},
+            {'$addToSet': {'sent': job}, '$unset': {f'leases.{job}': ''}}
+        )
+
+    async def release_reminder_job(self, event_id, job, owner):
+        """Trả lease khi xử lý thất bại để bản sao khác có thể thử lại"""
+        return await self.reminders.update_one(
+            {'event_id': event_id, f'leases.{job}.owner': owner},
+            {'$unset': {f'leases.{job}': ''}}
+        )
+
+    async def get_event_creators(self, event_ids):
+        """Lấy ID người tạo của nhiều sự kiện trong một truy vấn"""
+        cursor = self.events.find(
+            {'event_id': {'$in': list(event_ids)}},
+            {'event_id': 1, 'created_by': 1, '_id': 0}
+        )
+        return {event['event_id']: event.get('created_by') async for event in cursor}
+
+    async def save_watch_channel(self, channel: dict):
+        return await self.watch_channels.replace_one(
+            {'channel_id': channel['channel_id']},
+            channel,
+            upsert=True
+        )
+
+    async def delete_watch_channel(self, channel_id):
+        return await self.watch_channels.delete_one({'channel_id': channel_id})
+
+    async def get_watch_channels(self):
+        return await self.watch_channels.find({}, {'_id': 0}).to_list(length=None)
+
+    async def get_watch_channel(self, channel_id):
+        return await self.watch_channels.find_one({'channel_id': channel_id}, {'_id': 0})
+
+    async def find_watch_channel(self, user_id: str, calendar_id, expires_after):
+        """Kênh watch còn hạn của calendar (có thể do process khác đăng ký)"""
+        return await self.watch_channels.find_one(
+            {'user_id': user_id, 'calendar_id': calendar_id, 'expiration': {'$gt': expires_after}},
+            {'_id': 0},
+            sort=[('expiration', -1)]
+        )
+
+    async def save_user_calendar(self, user_id: str, calendar_id: str):
         """Lưu Calendar ID đã mã hóa cho user"""
         encrypted_id = self.encryption.encrypt(calendar_id)
-        return self.user_settings.update_one(
+        result = await self.user_settings.update_one(
             {'user_id': user_id},
             {'$set': {'calendar_id': encrypted_id}},
             upsert=True
         )
+        self.settings_cache.invalidate(user_id)
+        return result
+
+    async def get_user_settings(self, user_id: str) -> dict:
+        """Lấy toàn bộ cài đặt của user (đã giải mã), có cache"""
+        settings = self.settings_cache.get(user_id)
+        if settings is None:
+            document = await self.user_settings.find_one({'user_id': user_id}, {'_id': 0, 'user_id': 0})
+            settings = {}
+            for key, value in (document or {}).items():
+                if key in ENCRYPTED_SETTINGS:
+                    value = self.encryption.decrypt(value) if value else None
+                settings[key] = value
+            # Entry rỗng sống ngắn hơn để cài đặt vừa lưu ở bản sao khác sớm có hiệu lực
+            self.settings_cache.set(
+                user_id,
+                settings,
+                ttl=SETTINGS_CACHE_TTL if settings else SETTINGS_CACHE_NEGATIVE_TTL
+            )
+        return dict(settings)
 
-    def get_user_calendar(self, user_id: str) -> str:
+    async def get_user_calendar(self, user_id: str) -> str:
         """Lấy và giải mã Calendar ID của user"""
-        setting = self.user_settings.find_one({'user_id': user_id})
-        if setting and setting.get('calendar_id'):
-            return self.encryption.decrypt(setting['calendar_id'])
-        return None
+        settings = await self.get_user_settings(user_id)
+        return settings.get('calendar_id')
 
-    def delete_user_calendar(self, user_id: str):
+    async def delete_user_calendar(self, user_id: str):
         """Xóa Calendar ID của user"""
-        return self.user_settings.delete_one({'user_id': user_id})
+        result = await self.user_settings.delete_one({'user_id': user_id})
+        self.settings_cache.invalidate(user_id)
+        return result
 
-    def add_authorized_user(self, user_id: str):
+    async def add_authorized_user(self, user_id: str):
         """Thêm user được phép sử dụng bot"""
-        return self.authorized_users.update_one(
+        result = await self.authorized_users.update_one(
             {'user_id': user_id},
             {'$set': {'authorized': True}},
             upsert=True
         )
+        self.auth_cache.invalidate(user_id)
+        return result
 
-    def remove_authorized_user(self, user_id: str):
+    async def remove_authorized_user(self, user_id: str):
         """Xóa quyền sử dụng bot của user"""
-        return self.authorized_users.delete_one({'user_id': user_id})
+        result = await self.authorized_users.delete_one({'user_id': user_id})
+        self.auth_cache.invalidate(user_id)
+        return result
+
+    async def is_authorized(self, user_id: str) -> bool:
+        """Kiểm tra user có được phép sử dụng bot không (có cache)"""
+        authorized = self.auth_cache.get(user_id)
+        if authorized is not None:
+            return authorized
+
+        user = await self.authorized_users.find_one({'user_id': user_id}, {'_id': 1})
+        authorized = bool(user)
+        # Entry âm sống ngắn hơn để user mới được cấp quyền ở bản sao khác sớm có hiệu lực
+        self.auth_cache.set(
+            user_id,
+            authorized,
+            ttl=AUTH_CACHE_TTL if authorized else AUTH_CACHE_NEGATIVE_TTL
+        )
+        return authorized
 
-    def is_authorized(self, user_id: str) -> bool:
-        """Kiểm tra user có được phép sử dụng bot không"""
-        user = self.authorized_users.find_one({'user_id': user_id})
-        return bool(user)
+    async def watch_authorized_users(self):
+        """Theo dõi change stream để đồng bộ cache quyền giữa các bản sao bot"""
+        while True:
+            try:
+                async with self.authorized_users.watch(full_document='updateLookup') as stream:
+                    async for change in stream:
+                        document = change.get('fullDocument')
+                        if document and document.get('user_id'):
+                            self.auth_cache.invalidate(document['user_id'])
+                        else:
+                            # Sự kiện delete chỉ có _id, không biết user_id nên xóa toàn bộ cache
+                            self.auth_cache.clear()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                print(f"❌ Không thể mở change stream (cần replica set): {str(e)}")
+                return
+            except Exception as e:
+                print(f"❌ Change stream bị ngắt, thử lại sau 5 giây: {str(e)}")
+                self.auth_cache.clear()
+                await asyncio.sleep(5)
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime
+from pytz import timezone
+
+LOCAL_TZ = timezone('Asia/Ho_Chi_Minh')
+
+class ImportStats:
+    """Tiến độ của một lần import"""
+    __slots__ = ('parsed', 'imported', 'duplicates', 'past', 'failed', 'no_reminder', 'done')
+
+    def __init__(self):
+        self.parsed = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.past = 0
+        self.failed = 0
+        self.no_reminder = 0  # Đã thêm nhưng không đăng ký được nhắc nhở
+        self.done = False
+
+class EventImporter:
+    """Import hàng loạt sự kiện vào Google Calendar của user.
+
+    Sự kiện được đọc dần từ một async iterator (ví dụ IcsParser), gom thành
+    từng lô và xử lý tối đa `concurrency` lô cùng lúc: lọc trùng với MongoDB,
+    thêm lên Google bằng batch request, lưu bằng bulk_write và đăng ký nhắc
+    nhở một lần cho cả lô.
+    """
+
+    def __init__(self, bot, batch_size=100, concurrency=4):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    async def run(self, user_id: str, calendar_id, events, minutes_before=0, repeat_times=1,
+                  guild_id=None, on_progress=None):
+        """Import các sự kiện từ `events`, gọi `on_progress(stats)` sau mỗi lô"""
+        stats = ImportStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        seen = set()  # Sự kiện đã gặp trong file, để lọc trùng ngay trong file
+        now = datetime.now(LOCAL_TZ)
+
+        async def process(batch):
+            try:
+                await self._import_batch(
+                    user_id, calendar_id, batch, minutes_before, repeat_times, guild_id, stats
+                )
+            except Exception as e:
+                print(f"❌ Lỗi khi import lô sự kiện: {str(e)}")
+                stats.failed += len(batch)
+            finally:
+                semaphore.release()
+            if on_progress:
+                await on_progress(stats)
+
+        async def submit(batch):
+            await semaphore.acquire()
+            task = asyncio.get_event_loop().create_task(process(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        batch = []
+        try:
+            async for event in events:
+                stats.parsed += 1
+                if event['start'] < now:
+                    stats.past += 1
+                    continue
+
+                datetime_str = event['start'].astimezone(LOCAL_TZ).strftime('%Y-%m-%d %H:%M')
+                title = event['summary'] or "Không có tiêu đề"
+                key = (title, datetime_str)
+                if key in seen:
+                    stats.duplicates += 1
+                    continue
+                seen.add(key)
+
+                batch.append({
+                    'title': title,
+                    'datetime': datetime_str,
+                    'description': event['description'] or "Không có mô tả"
+                })
+                if len(batch) >= self.batch_size:
+                    await submit(batch)
+                    batch = []
+
+            if batch:
+                await submit(batch)
+        finally:
+            # Chờ các lô đang xử lý xong kể cả khi đọc file bị lỗi giữa chừng
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        stats.done = True
+        if on_progress:
+            await on_progress(stats)
+        return stats
+
+    async def _import_batch(self, user_id, calendar_id, batch, minutes_before, repeat_times, guild_id,
+                            stats):
+        db_manager = self.bot.db_manager
+
+        # Bỏ các sự kiện user đã có (cùng tiêu đề và thời gian)
+        existing = await db_manager.find_existing_events(
+            user_id, [(event['title'], event['datetime']) for event in batch]
+        )
+        if existing:
+            fresh = [event for event in batch if (event['title'], event['datetime']) not in existing]
+            stats.duplicates += len(batch) - len(fresh)
+            batch = fresh
+        if not batch:
+            return
+
+        results = await self.bot.calendar_manager.add_events(batch, user_id, calendar_id=calendar_id)
+        created = []
+        for event, result in zip(batch, results):
+            if result['ok']:
+                created.append({**event, 'event_id': result['id']})
+            else:
+                stats.failed += 1
+        if not created:
+            return
+
+        try:
+            await db_manager.save_events(created, user_id)
+        except Exception as e:
+            # Không lưu được thì bot không theo dõi các sự kiện này: xóa khỏi Google để import lại không bị trùng
+            print(f"❌ Lỗi khi lưu lô sự kiện đã import: {str(e)}")
+            await self._discard_created(user_id, calendar_id, created)
+            stats.failed += len(created)
+            return
+
+        # Sự kiện đã được thêm và lưu, chỉ thiếu nhắc nhở thì vẫn tính là đã import
+        stats.imported += len(created)
+        scheduled = await self.bot.scheduler.schedule_reminders([
+            (event['event_id'], event['title'], event['datetime'], minutes_before, repeat_times)
+            for event in created
+        ], guild_id=guild_id)
+        if scheduled is False:
+            stats.no_reminder += len(created)
+
+    async def _discard_created(self, user_id, calendar_id, created):
+        """Xóa các sự kiện vừa thêm lên Google Calendar (và bản ghi có thể đã lưu một phần)"""
+        event_ids = [event['event_id'] for event in created]
+        try:
+            await self.bot.db_manager.delete_events(event_ids)
+        except Exception as e:
+            print(f"❌ Lỗi khi xóa bản ghi sự kiện đã import: {str(e)}")
+        results = await self.bot.calendar_manager.delete_events(event_ids, user_id, calendar_id=calendar_id)
+        remaining = [event_id for event_id, result in zip(event_ids, results) if not result['ok']]
+        if remaining:
+            print(f"❌ Không thể xóa {len(remaining)} sự kiện đã import khỏi Google Calendar: {remaining}")
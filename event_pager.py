@@ -0,0 +1,42 @@
+class EventPager:
+    """Chia một luồng sự kiện (async iterator) thành các trang cố định.
+
+    Chỉ lấy thêm sự kiện từ luồng khi người dùng chuyển tới trang chưa tải,
+    các trang đã xem được giữ lại nên quay lại trang trước không gọi lại API.
+    """
+
+    def __init__(self, events, page_size=10, predicate=None):
+        self._source = events.__aiter__()
+        self.page_size = page_size
+        self.predicate = predicate  # Chỉ giữ sự kiện thỏa điều kiện (nếu có)
+        self.events = []
+        self.exhausted = False
+
+    async def _fill(self, count):
+        while len(self.events) < count and not self.exhausted:
+            try:
+                event = await self._source.__anext__()
+            except StopAsyncIteration:
+                self.exhausted = True
+                break
+            except Exception as e:
+                print(f"Error listing events: {e}")
+                self.exhausted = True
+                break
+            if self.predicate is None or self.predicate(event):
+                self.events.append(event)
+
+    async def page(self, index):
+        """Các sự kiện của trang `index` (bắt đầu từ 0)"""
+        start = index * self.page_size
+        # Lấy dư một sự kiện để biết còn trang sau hay không
+        await self._fill(start + self.page_size + 1)
+        return self.events[start:start + self.page_size]
+
+    def has_next(self, index):
+        return len(self.events) > (index + 1) * self.page_size
+
+    def remove(self, event_ids):
+        """Bỏ các sự kiện vừa bị xóa khỏi các trang đã tải"""
+        event_ids = set(event_ids)
+        self.events = [event for event in self.events if event['id'] not in event_ids]
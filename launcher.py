@@ -0,0 +1,76 @@
+"""Chạy bot trên nhiều process, mỗi process giữ một dải shard liên tiếp.
+
+Chạy: python launcher.py
+Số process lấy từ SHARD_PROCESSES, số shard lấy từ SHARD_COUNT (0: dùng số
+shard Discord đề xuất). Nhắc nhở của mỗi guild được gửi từ process giữ
+shard của guild đó; process giữ shard 0 nhận cả nhắc nhở tạo từ DM và
+webhook Google Calendar.
+"""
+import multiprocessing
+import time
+
+import requests
+
+from config import DISCORD_TOKEN, SHARD_COUNT, SHARD_PROCESSES
+
+RESTART_DELAY = 5  # Giây chờ trước khi khởi động lại process bị dừng
+
+def recommended_shard_count():
+    """Số shard Discord đề xuất cho bot"""
+    response = requests.get(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f'Bot {DISCORD_TOKEN}'},
+        timeout=10
+    )
+    response.raise_for_status()
+    return response.json()['shards']
+
+def shard_ranges(shard_count, processes):
+    """Chia các shard thành `processes` dải liên tiếp, kích thước chênh nhau tối đa 1"""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for idx in range(processes):
+        end = start + size + (1 if idx < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+def run_shards(shard_ids, shard_count):
+    # Import trong process con để mỗi process tự tạo client Discord/MongoDB của riêng nó
+    from bot import run_bot
+    run_bot(shard_ids=shard_ids, shard_count=shard_count)
+
+def start_process(context, shard_ids, shard_count):
+    process = context.Process(
+        target=run_shards,
+        args=(shard_ids, shard_count),
+        name=f"shards-{shard_ids[0]}-{shard_ids[-1]}"
+    )
+    process.start()
+    print(f"✓ Đã khởi động process {process.name} (pid {process.pid})")
+    return process
+
+def main():
+    shard_count = SHARD_COUNT or recommended_shard_count()
+    ranges = shard_ranges(shard_count, SHARD_PROCESSES)
+    print(f"🚀 Chạy {shard_count} shard trên {len(ranges)} process")
+
+    context = multiprocessing.get_context('spawn')
+    processes = {tuple(shard_ids): start_process(context, shard_ids, shard_count) for shard_ids in ranges}
+    try:
+        while True:
+            time.sleep(RESTART_DELAY)
+            for shard_ids, process in list(processes.items()):
+                if not process.is_alive():
+                    print(f"❌ Process {process.name} đã dừng (mã {process.exitcode}), khởi động lại")
+                    processes[shard_ids] = start_process(context, list(shard_ids), shard_count)
+    except KeyboardInterrupt:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import discord
+from utils.cache import TTLCache
+
+class MemberLookup:
+    """Tra cứu member của server khi không cache toàn bộ member.
+
+    Chỉ giữ các member mà bot tương tác (người dùng lệnh, người tạo sự kiện);
+    member khác được lấy qua API khi cần và giữ trong cache nhỏ có thời hạn,
+    nên bộ nhớ tăng theo số người dùng thực sự thay vì tổng số member.
+    """
+
+    def __init__(self, maxsize=5000, ttl=600, negative_ttl=60):
+        self._members = TTLCache(maxsize=maxsize, ttl=ttl)  # (guild_id, user_id) -> Member hoặc False
+        self.negative_ttl = negative_ttl
+        self.fetches = 0
+
+    def __len__(self):
+        return len(self._members)
+
+    @property
+    def cache(self):
+        """Cache member theo (server, user), gồm cả kết quả không tìm thấy"""
+        return self._members
+
+    def remember(self, member):
+        """Lưu member vừa tương tác với bot"""
+        if isinstance(member, discord.Member):
+            self._members.set((member.guild.id, member.id), member)
+
+    def forget(self, guild_id, user_id):
+        self._members.invalidate((guild_id, user_id))
+
+    async def get(self, guild, user_id: int):
+        """Lấy member trong server: cache của bot, cache này, rồi mới gọi API"""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+
+        key = (guild.id, user_id)
+        cached = self._members.get(key)
+        if cached is not None:
+            return cached or None
+
+        try:
+            self.fetches += 1
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            self._members.set(key, False, ttl=self.negative_ttl)
+            return None
+        except discord.HTTPException as e:
+            print(f"❌ Không thể lấy member {user_id} trong server {guild.id}: {str(e)}")
+            return None
+        self._members.set(key, member)
+        return member
@@ -0,0 +1,115 @@
+import math
+from aiohttp import web
+from utils.metrics import REGISTRY
+
+class MetricsServer:
+    """HTTP server nội bộ xuất metrics (/metrics, định dạng Prometheus) và trạng thái (/healthz).
+
+    Bộ đếm lệnh, Calendar API, MongoDB được ghi trực tiếp tại nơi gọi; các giá trị
+    tức thời (hàng đợi nhắc nhở, cache, thread pool) được đọc từ bot khi có request.
+    """
+
+    def __init__(self, bot, host='127.0.0.1', port=9100, registry=REGISTRY):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._runner = None
+        self._register_collectors()
+
+    def _caches(self):
+        bot = self.bot
+        return {
+            'auth': bot.db_manager.auth_cache,
+            'settings': bot.db_manager.settings_cache,
+            'credentials': bot.calendar_manager.credential_store.cache,
+            'calendar_mirrors': bot.calendar_sync.cache,
+            'recipients': bot.scheduler.recipients.cache,
+            'members': bot.member_lookup.cache,
+        }
+
+    def _register_collectors(self):
+        scheduler = self.bot.scheduler
+        dispatcher = scheduler.dispatcher
+        executor = self.bot.calendar_manager.executor
+        collector = self.registry.collector
+
+        collector('reminder_series', 'Số sự kiện đang có lịch nhắc trong engine', lambda: len(scheduler.engine))
+        collector('reminder_queue_depth', 'Số lần gửi nhắc nhở đang chờ trong hàng đợi', lambda: dispatcher.depth)
+        collector(
+            'reminder_deliveries_total', 'Số lần gửi nhắc nhở theo kết quả',
+            lambda: [({'status': 'ok'}, dispatcher.sent), ({'status': 'error'}, dispatcher.failed)],
+            type='counter'
+        )
+        collector(
+            'reminder_lateness_seconds', 'Độ trễ gửi nhắc nhở so với lịch (lần gần nhất và lớn nhất)',
+            lambda: [({'kind': 'last'}, dispatcher.last_lateness), ({'kind': 'max'}, dispatcher.max_lateness)]
+        )
+        if scheduler.leases:
+            collector(
+                'reminder_leases_total', 'Số lần claim lease nhắc nhở theo kết quả',
+                lambda: [({'status': 'claimed'}, scheduler.leases.claimed),
+                         ({'status': 'skipped'}, scheduler.leases.skipped)],
+                type='counter'
+            )
+        collector(
+            'calendar_executor_calls', 'Lời gọi Calendar API đang chờ/đang chạy trong thread pool',
+            lambda: [({'state': 'waiting'}, executor.waiting), ({'state': 'active'}, executor.active)]
+        )
+        collector(
+            'cache_hits_total', 'Số lần đọc cache trúng',
+            lambda: [({'cache': name}, cache.hits) for name, cache in self._caches().items()],
+            type='counter'
+        )
+        collector(
+            'cache_misses_total', 'Số lần đọc cache trượt (không có hoặc đã hết hạn)',
+            lambda: [({'cache': name}, cache.misses) for name, cache in self._caches().items()],
+            type='counter'
+        )
+        collector(
+            'cache_entries', 'Số entry đang giữ trong cache',
+            lambda: [({'cache': name}, len(cache)) for name, cache in self._caches().items()]
+        )
+        collector(
+            'discord_latency_seconds', 'Độ trễ heartbeat gateway theo shard',
+            lambda: [({'shard': shard_id}, latency) for shard_id, latency in self.bot.latencies
+                     if not math.isnan(latency) and not math.isinf(latency)]
+        )
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        app.router.add_get('/healthz', self._handle_health)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"✓ Metrics đang lắng nghe tại http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle_metrics(self, request):
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+    def health(self):
+        bot = self.bot
+        checks = {
+            'gateway': bot.is_ready() and not bot.is_closed(),
+            'services': bot.services_status == 'ok',
+            'scheduler': bot.scheduler.engine.running,
+        }
+        return {
+            'status': 'ok' if all(checks.values()) else 'unavailable',
+            'checks': checks,
+            'services': bot.services_status,
+            'shards': sorted(bot.shards) if bot.is_ready() else [],
+            'reminder_queue_depth': bot.scheduler.dispatcher.depth,
+        }
+
+    async def _handle_health(self, request):
+        health = self.health()
+        return web.json_response(health, status=200 if health['status'] == 'ok' else 503)
@@ -0,0 +1,152 @@
+import discord
+from utils.cache import TTLCache
+
+class Recipient:
+    """Nơi gửi nhắc nhở cho một user: kênh DM và kênh dự phòng trong server"""
+    __slots__ = ('user_id', 'dm_channel_id', 'guild_id', 'fallback_channel_id')
+
+    def __init__(self, user_id, dm_channel_id=None, guild_id=None, fallback_channel_id=None):
+        self.user_id = user_id
+        self.dm_channel_id = dm_channel_id
+        self.guild_id = guild_id
+        self.fallback_channel_id = fallback_channel_id
+
+class RecipientCache:
+    """Cache ánh xạ ID người tạo sự kiện -> kênh nhận nhắc nhở.
+
+    Được ghi khi tạo sự kiện và cập nhật theo các sự kiện member/guild,
+    nhờ vậy gửi nhắc nhở chỉ là một lần tra cứu và một lần gửi thay vì
+    duyệt qua mọi server.
+    """
+
+    def __init__(self, bot, maxsize=50000, ttl=7 * 24 * 3600):
+        self.bot = bot
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def cache(self):
+        """Cache user -> nơi nhận nhắc nhở"""
+        return self._entries
+
+    @staticmethod
+    def find_fallback_channel(guild):
+        """Kênh dự phòng khi không gửi được DM"""
+        return discord.utils.get(guild.text_channels, name='general')
+
+    async def remember(self, user, guild=None):
+        """Lưu nơi nhận nhắc nhở của user ngay khi tạo sự kiện"""
+        entry = self._entries.get(user.id) or Recipient(user.id)
+        try:
+            dm_channel = user.dm_channel or await user.create_dm()
+            entry.dm_channel_id = dm_channel.id
+        except discord.HTTPException as e:
+            print(f"❌ Không thể mở kênh DM cho user {user.id}: {str(e)}")
+
+        if guild is not None:
+            channel = self.find_fallback_channel(guild)
+            entry.guild_id = guild.id
+            entry.fallback_channel_id = channel.id if channel else None
+
+        self._entries.set(user.id, entry)
+        return entry
+
+    async def resolve(self, user_id: int):
+        """Lấy nơi nhận nhắc nhở, tự dò lại nếu chưa có trong cache (ví dụ sau khi khởi động lại)"""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            return entry
+
+        user = self.bot.get_user(user_id)
+        if user is None:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.HTTPException:
+                return None
+        return await self.remember(user)
+
+    def _use_fallback(self, entry, guild):
+        channel = self.find_fallback_channel(guild)
+        if channel:
+            entry.guild_id = guild.id
+            entry.fallback_channel_id = channel.id
+            return True
+        return False
+
+    async def _resolve_fallback(self, entry, guild_id=None):
+        """Dò kênh dự phòng (chỉ khi DM thất bại và chưa có trong cache).
+
+        Thử server nơi tạo sự kiện trước (tra cứu member theo yêu cầu), sau đó
+        mới duyệt các server qua member đang có trong cache.
+        """
+        guild = self.bot.get_guild(guild_id) if guild_id else None
+        if guild is not None and await self.bot.member_lookup.get(guild, entry.user_id):
+            if self._use_fallback(entry, guild):
+                return True
+
+        for guild in self.bot.guilds:
+            if guild.get_member(entry.user_id) and self._use_fallback(entry, guild):
+                return True
+        return False
+
+    async def send(self, user_id: int, embed, guild_id=None):
+        """Gửi embed cho user qua DM, nếu bị chặn thì gửi vào kênh dự phòng"""
+        entry = await self.resolve(user_id)
+        if entry is None:
+            print(f"❌ Không tìm thấy user ID {user_id}")
+            return False
+
+        if entry.dm_channel_id:
+            try:
+                print(f"📨 Đang gửi DM cho user {user_id}...")
+                await self.bot.get_partial_messageable(
+                    entry.dm_channel_id, type=discord.ChannelType.private
+                ).send(embed=embed)
+                print(f"✓ Đã gửi DM thành công")
+                return True
+            except discord.Forbidden as e:
+                print(f"❌ Không thể gửi DM: {str(e)}")
+            except discord.NotFound:
+                entry.dm_channel_id = None
+
+        print("↪️ Thử gửi vào kênh general...")
+        if not entry.fallback_channel_id and not await self._resolve_fallback(entry, guild_id):
+            print("❌ Không tìm thấy kênh general")
+            return False
+
+        await self.bot.get_partial_messageable(
+            entry.fallback_channel_id, guild_id=entry.guild_id
+        ).send(f"<@{user_id}>", embed=embed)
+        print(f"✓ Đã gửi thông báo vào kênh {entry.fallback_channel_id}")
+        return True
+
+    def forget(self, user_id: int):
+        self._entries.invalidate(user_id)
+
+    def on_member_remove(self, guild_id, user_id):
+        """User rời server: kênh dự phòng trong server đó không còn dùng được"""
+        entry = self._entries.get(user_id)
+        if entry and entry.guild_id == guild_id:
+            entry.guild_id = entry.fallback_channel_id = None
+
+    def on_member_join(self, member):
+        entry = self._entries.get(member.id)
+        if entry and not entry.fallback_channel_id:
+            channel = self.find_fallback_channel(member.guild)
+            if channel:
+                entry.guild_id = member.guild.id
+                entry.fallback_channel_id = channel.id
+
+    def on_guild_remove(self, guild):
+        self._clear_fallback(lambda entry: entry.guild_id == guild.id)
+
+    def on_guild_channel_delete(self, channel):
+        self._clear_fallback(lambda entry: entry.fallback_channel_id == channel.id)
+
+    def _clear_fallback(self, predicate):
+        # Sự kiện hiếm gặp nên chấp nhận duyệt toàn bộ cache
+        for entry in self._entries.values():
+            if predicate(entry):
+                entry.guild_id = entry.fallback_channel_id = None
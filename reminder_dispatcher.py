@@ -0,0 +1,129 @@
+import asyncio
+import itertools
+import time
+from utils.cache import TTLCache
+from utils.rate_limit import TokenBucket
+
+class ReminderDispatcher:
+    """Hàng đợi gửi nhắc nhở với các worker và giới hạn tốc độ theo Discord.
+
+    Các lần gửi được ưu tiên theo thời điểm đến hạn (trễ nhiều nhất đi
+    trước), đi qua một bucket toàn cục và một bucket cho từng route
+    (mỗi người nhận) để không dồn cục vào giới hạn của Discord khi có
+    hàng nghìn nhắc nhở cùng đến hạn.
+    """
+
+    SKIPPED = 'skipped'  # func trả về giá trị này khi không gửi (không tính là đã gửi hay lỗi)
+
+    def __init__(self, workers=4, global_rate=45, route_rate=5, route_period=5, report_interval=30):
+        self.workers = workers
+        self.global_bucket = TokenBucket(global_rate, 1)
+        self.route_rate = route_rate
+        self.route_period = route_period
+        self.report_interval = report_interval
+        self._route_buckets = TTLCache(maxsize=10000, ttl=route_period * 10)
+        self._queue = None
+        self._deferred = {}  # seq -> handle của các lần gửi bị hoãn do rate limit của người nhận
+        self._seq = itertools.count()
+        self._tasks = []
+        self.sent = 0
+        self.failed = 0
+        self.max_lateness = 0.0
+        self.last_lateness = 0.0
+
+    @property
+    def depth(self):
+        """Số lần gửi đang chờ trong hàng đợi (kể cả đang bị hoãn)"""
+        return (self._queue.qsize() if self._queue else 0) + len(self._deferred)
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'last_lateness': self.last_lateness,
+            'max_lateness': self.max_lateness
+        }
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.PriorityQueue()
+        loop = asyncio.get_event_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._report()))
+
+    async def stop(self):
+        for handle in self._deferred.values():
+            handle.cancel()
+        self._deferred = {}
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, due, route, func, *args):
+        """Đưa một lần gửi vào hàng đợi; `due` là timestamp đến hạn, `route` là khóa rate limit"""
+        if self._queue is None:
+            self.start()
+        self._queue.put_nowait((due, next(self._seq), route, func, args))
+
+    def submit_later(self, delay, due, route, func, *args):
+        """Như submit nhưng chỉ đưa vào hàng đợi sau `delay` giây (vẫn ưu tiên theo `due`)"""
+        if self._queue is None:
+            self.start()
+        self._defer(delay, (due, next(self._seq), route, func, args))
+
+    def _defer(self, delay, item):
+        """Đưa lại lần gửi vào hàng đợi sau `delay` giây, giữ nguyên thứ tự ưu tiên theo `due`"""
+        seq = item[1]
+        self._deferred[seq] = asyncio.get_event_loop().call_later(delay, self._resume, item)
+
+    def _resume(self, item):
+        if self._deferred.pop(item[1], None) is not None:
+            self._queue.put_nowait(item)
+
+    def _route_bucket(self, route):
+        bucket = self._route_buckets.get(route)
+        if bucket is None:
+            bucket = TokenBucket(self.route_rate, self.route_period)
+            self._route_buckets.set(route, bucket)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            due, _, route, func, args = item
+            try:
+                wait = self._route_bucket(route).try_acquire()
+                if wait > 0:
+                    # Người nhận này đang chạm giới hạn: hoãn lần gửi, worker chuyển sang người nhận khác
+                    self._defer(wait, item)
+                    continue
+                await self.global_bucket.acquire()
+                lateness = max(0.0, time.time() - due)
+                result = await func(*args)
+                if result is False:
+                    self.failed += 1
+                elif result is not self.SKIPPED:
+                    self.sent += 1
+                    self.last_lateness = lateness
+                    self.max_lateness = max(self.max_lateness, lateness)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Lỗi khi gửi nhắc nhở từ hàng đợi: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            if self.depth:
+                print(f"📬 Hàng đợi nhắc nhở: {self.depth} đang chờ, "
+                      f"trễ gần nhất {self.last_lateness:.1f}s, trễ tối đa {self.max_lateness:.1f}s")
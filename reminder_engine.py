@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+REMINDER_INTERVAL_SECONDS = 15  # Khoảng cách giữa các lần nhắc lặp lại
+
+class ReminderSeries:
+    """Toàn bộ chuỗi nhắc nhở (các lần nhắc + lần dọn dẹp) của một sự kiện"""
+    __slots__ = (
+        'event_id', 'title', 'minutes_before', 'first_fire', 'repeat_times',
+        'cleanup_at', 'guild_id', 'next_index', 'cancelled'
+    )
+
+    def __init__(self, event_id, title, minutes_before, first_fire, repeat_times, cleanup_at,
+                 guild_id=None):
+        self.event_id = event_id
+        self.title = title
+        self.minutes_before = minutes_before
+        self.first_fire = first_fire  # Timestamp (giây) của lần nhắc đầu tiên
+        self.repeat_times = repeat_times
+        self.cleanup_at = cleanup_at  # Timestamp (giây) của lần dọn dẹp
+        self.guild_id = guild_id  # Server tạo sự kiện, quyết định process (shard) xử lý nhắc nhở
+        self.next_index = 0  # Lần nhắc kế tiếp, == repeat_times nghĩa là chỉ còn dọn dẹp
+        self.cancelled = False
+
+    @property
+    def next_fire(self):
+        """Thời điểm chạy kế tiếp của chuỗi"""
+        if self.next_index < self.repeat_times:
+            return self.first_fire + self.next_index * REMINDER_INTERVAL_SECONDS
+        return self.cleanup_at
+
+    def skip_until(self, now, grace):
+        """Bỏ qua các lần nhắc đã trễ quá thời gian cho phép"""
+        while self.next_index < self.repeat_times and self.next_fire + grace < now:
+            self.next_index += 1
+
+class ReminderEngine:
+    """Bộ hẹn giờ dạng heap theo thời điểm chạy, mỗi sự kiện chỉ có một entry.
+
+    Hủy nhắc nhở là O(1): entry bị đánh dấu cancelled và bỏ khỏi index,
+    phần tử tương ứng trong heap được loại lười khi nổi lên đỉnh.
+    """
+
+    def __init__(self, on_reminder, on_cleanup, reminder_grace=15, cleanup_grace=60):
+        self.on_reminder = on_reminder
+        self.on_cleanup = on_cleanup
+        self.reminder_grace = reminder_grace
+        self.cleanup_grace = cleanup_grace
+        self._heap = []  # (timestamp, seq, series)
+        self._series = {}  # event_id -> ReminderSeries
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._task = None
+        self._callbacks = set()
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, event_id):
+        return event_id in self._series
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def get(self, event_id):
+        return self._series.get(event_id)
+
+    def add(self, series: ReminderSeries, now=None):
+        """Thêm (hoặc thay thế) chuỗi nhắc nhở của một sự kiện"""
+        self._prepare(series, time.time() if now is None else now)
+        heapq.heappush(self._heap, (series.next_fire, next(self._seq), series))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def add_many(self, series_list, now=None):
+        """Đăng ký hàng loạt, dựng lại heap một lần thay vì push từng phần tử"""
+        now = time.time() if now is None else now
+        for series in series_list:
+            self._prepare(series, now)
+            self._heap.append((series.next_fire, next(self._seq), series))
+        heapq.heapify(self._heap)
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _prepare(self, series, now):
+        old = self._series.get(series.event_id)
+        if old is not None:
+            old.cancelled = True
+        series.skip_until(now, self.reminder_grace)
+        self._series[series.event_id] = series
+
+    def cancel(self, event_id):
+        """Hủy toàn bộ chuỗi nhắc nhở của sự kiện, trả về True nếu có"""
+        series = self._series.pop(event_id, None)
+        if series is None:
+            return False
+        series.cancelled = True
+        return True
+
+    def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            # Loại các entry đã bị hủy hoặc bị thay thế ở đỉnh heap
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, series = heapq.heappop(self._heap)
+            if not series.cancelled:
+                self._fire(series, time.time())
+
+    def _fire(self, series, now):
+        if series.next_index < series.repeat_times:
+            if series.next_fire + self.reminder_grace >= now:
+                self._spawn(self.on_reminder(series, series.next_fire))
+            series.next_index += 1
+            series.skip_until(now, self.reminder_grace)
+            heapq.heappush(self._heap, (series.next_fire, next(self._seq), series))
+            return
+
+        # Lần chạy cuối cùng: dọn dẹp và bỏ sự kiện khỏi index
+        self._series.pop(series.event_id, None)
+        series.cancelled = True
+        if series.cleanup_at + self.cleanup_grace >= now:
+            self._spawn(self.on_cleanup(series))
+
+    def _spawn(self, coro):
+        # Mỗi callback chạy trong task riêng để một lần gửi chậm không làm trễ các lần khác
+        task = asyncio.get_event_loop().create_task(coro)
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
@@ -0,0 +1,80 @@
+import os
+import socket
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from pytz import utc
+
+# Một job cần lease: `name` gắn với thời điểm chạy (r<timestamp> cho lần nhắc) để
+# lịch mới sau khi lập lịch lại không trùng với các job đã ghi trong `sent`.
+LeaseJob = namedtuple('LeaseJob', 'event_id cleanup_at name due')
+
+class ReminderLeases:
+    """Phân chia các lần nhắc/dọn dẹp giữa nhiều bản sao bot qua MongoDB.
+
+    Mỗi job của một sự kiện (một lần nhắc hoặc lần dọn dẹp) được claim bằng
+    một find_one_and_update nguyên tử trên document reminders. Lease có thời
+    hạn để bản sao khác tiếp quản khi bản sao đang giữ bị dừng, và job đã
+    xong được ghi vào mảng `sent` nên không bị gửi lại lần thứ hai.
+    """
+
+    CLAIMED = 'claimed'  # Bản sao này được xử lý job
+    DONE = 'done'        # Job đã được xử lý xong
+    HELD = 'held'        # Bản sao khác đang giữ lease
+    STALE = 'stale'      # Sự kiện đã bị xóa hoặc lập lịch lại
+
+    def __init__(self, db_manager, lease_seconds=30, owner=None):
+        self.db_manager = db_manager
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.claimed = 0
+        self.skipped = 0
+
+    @staticmethod
+    def _naive_utc(timestamp):
+        # MongoDB lưu datetime với độ chính xác mili giây
+        value = datetime.fromtimestamp(timestamp, utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+    @staticmethod
+    def reminder_job(series, due):
+        return LeaseJob(series.event_id, series.cleanup_at, f"r{round(due)}", due)
+
+    @staticmethod
+    def cleanup_job(series):
+        return LeaseJob(series.event_id, series.cleanup_at, 'cleanup', series.cleanup_at)
+
+    async def claim(self, job):
+        """Giành (hoặc gia hạn) lease cho `job`, trả về (trạng thái, thời điểm lease hết hạn)"""
+        now = time.time()
+        cleanup_at = self._naive_utc(job.cleanup_at)
+        claimed = await self.db_manager.claim_reminder_job(
+            job.event_id,
+            cleanup_at,
+            job.name,
+            self.owner,
+            self._naive_utc(now),
+            self._naive_utc(now + self.lease_seconds)
+        )
+        if claimed:
+            self.claimed += 1
+            return self.CLAIMED, None
+
+        self.skipped += 1
+        state = await self.db_manager.get_reminder_state(job.event_id)
+        # cleanup_at khác nghĩa là sự kiện đã được lập lịch lại ở bản sao khác
+        if not state or state.get('cleanup_at') != cleanup_at:
+            return self.STALE, None
+        if job.name in state.get('sent', []):
+            return self.DONE, None
+        lease = state.get('leases', {}).get(job.name, {})
+        until = lease.get('until')
+        return self.HELD, utc.localize(until).timestamp() if until else now
+
+    async def complete(self, job):
+        """Ghi nhận job đã xong, kể cả khi lease đã bị bản sao khác tiếp quản trong lúc gửi"""
+        await self.db_manager.complete_reminder_job(job.event_id, job.name)
+
+    async def release(self, job):
+        await self.db_manager.release_reminder_job(job.event_id, job.name, self.owner)
@@ -1,185 +1,477 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import asyncio
 from datetime import datetime, timedelta
 import discord
-from pytz import timezone
+from pytz import timezone, utc
+import time
+from reminder_engine import ReminderEngine, ReminderSeries, REMINDER_INTERVAL_SECONDS
+from recipient_cache import RecipientCache
+from reminder_dispatcher import ReminderDispatcher
+from reminder_lease import ReminderLeases
+from utils.metrics import SCHEDULER_JOBS
+from config import (
+    DISPATCH_WORKERS, DISPATCH_GLOBAL_RATE, DISPATCH_ROUTE_RATE, DISPATCH_ROUTE_PERIOD,
+    REMINDER_LEASES, REMINDER_LEASE_SECONDS, REMINDER_REFRESH_INTERVAL
+)
+
+REMINDER_GRACE_SECONDS = 15  # Cho phép nhắc nhở chạy trễ tối đa 15s
+CLEANUP_GRACE_SECONDS = 60
+CLEANUP_BATCH_DELAY = 2  # Gom các sự kiện kết thúc gần nhau để xóa trong một batch
+LOCAL_TZ = timezone('Asia/Ho_Chi_Minh')
+
+def shard_key(guild_id):
+    """Phần timestamp của guild ID: shard_id = shard_key % shard_count (sự kiện từ DM thuộc shard 0)"""
+    return int(guild_id) >> 22 if guild_id else 0
 
 class SchedulerManager:
-    def __init__(self, bot):
+    def __init__(self, bot, use_leases=REMINDER_LEASES, lease_seconds=REMINDER_LEASE_SECONDS,
+                 refresh_interval=REMINDER_REFRESH_INTERVAL):
         self.bot = bot
-        self.scheduler = AsyncIOScheduler(
-            timezone=timezone('Asia/Ho_Chi_Minh'),
-            job_defaults={
-                'misfire_grace_time': 60,  # Cho phép job chạy trễ tối đa 60s
-                'coalesce': True  # Gộp các jobs bị miss
-            }
+        # Mỗi sự kiện là một entry duy nhất trong engine (gồm mọi lần nhắc và lần dọn dẹp)
+        self.engine = ReminderEngine(
+            self._on_reminder,
+            self._on_cleanup,
+            reminder_grace=REMINDER_GRACE_SECONDS,
+            cleanup_grace=CLEANUP_GRACE_SECONDS
+        )
+        self.recipients = RecipientCache(bot)
+        self._pending_cleanups = []
+        self._cleanup_task = None
+        self.dispatcher = ReminderDispatcher(
+            workers=DISPATCH_WORKERS,
+            global_rate=DISPATCH_GLOBAL_RATE,
+            route_rate=DISPATCH_ROUTE_RATE,
+            route_period=DISPATCH_ROUTE_PERIOD
         )
-        self.reminders = {}
+        # Khi chạy nhiều bản sao: mỗi lần nhắc/dọn dẹp chỉ do một bản sao xử lý
+        self.leases = ReminderLeases(bot.db_manager, lease_seconds) if use_leases else None
+        self.refresh_interval = refresh_interval
+        self._refresh_task = None
+        self._lease_waits = set()
 
     async def start(self):
-        self.scheduler.start()
+        if self.engine.running:  # on_ready có thể được gọi lại khi reconnect
+            return
+        # Khôi phục các nhắc nhở còn hiệu lực trước khi chạy engine
+        refreshed_at = datetime.utcnow()
+        await self.rehydrate()
+        self.dispatcher.start()
+        self.engine.start()
+        # Nhắc nhở có thể được tạo/sửa ở process khác: bản sao khác (lease) hoặc
+        # process giữ webhook khi chạy nhiều process
+        if self.leases or getattr(self.bot, 'shard_ids', None) is not None:
+            self._refresh_task = asyncio.get_event_loop().create_task(self._refresh_loop(refreshed_at))
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        for task in list(self._lease_waits):
+            task.cancel()
+        await self.engine.stop()
+        await self.dispatcher.stop()
+
+    async def rehydrate(self):
+        """Nạp lại các nhắc nhở chưa đến hạn từ MongoDB"""
+        try:
+            started = time.perf_counter()
+            now = datetime.now(utc)
+            reminders = [
+                reminder for reminder in await self._load_reminders(now) if not reminder.get('cancelled')
+            ]
+            self.engine.add_many(
+                (self._series_from_document(reminder) for reminder in reminders),
+                now=now.timestamp()
+            )
+
+            elapsed = time.perf_counter() - started
+            print(f"✓ Đã khôi phục {len(reminders)} sự kiện trong {elapsed:.3f}s")
+            return len(reminders)
+
+        except Exception as e:
+            print(f"❌ Lỗi khi khôi phục nhắc nhở: {str(e)}")
+            import traceback
+            print(traceback.format_exc())
+            return 0
+
+    async def _load_reminders(self, now, updated_since=None):
+        # Mỗi process chỉ nạp nhắc nhở của các guild thuộc shard mà nó quản lý
+        return await self.bot.db_manager.get_pending_reminders(
+            now.replace(tzinfo=None),
+            shard_ids=getattr(self.bot, 'shard_ids', None),
+            shard_count=getattr(self.bot, 'shard_count', None),
+            updated_since=updated_since
+        )
+
+    def owns(self, guild_id):
+        """Process này có giữ shard của guild không (luôn đúng khi chạy một process)"""
+        shard_ids = getattr(self.bot, 'shard_ids', None)
+        shard_count = getattr(self.bot, 'shard_count', None)
+        if shard_ids is None or not shard_count:
+            return True
+        return shard_key(guild_id) % shard_count in shard_ids
+
+    def _series_from_document(self, reminder):
+        return self._build_series(
+            reminder['event_id'],
+            reminder['title'],
+            utc.localize(reminder['event_time']),
+            reminder['minutes_before'],
+            reminder['repeat_times'],
+            reminder.get('guild_id')
+        )
+
+    async def _refresh_loop(self, refreshed_at):
+        """Nạp định kỳ các nhắc nhở vừa được bản sao/process khác tạo, lập lịch lại hoặc hủy"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                started = datetime.utcnow()
+                # Lùi lại một chút để không bỏ sót document ghi cùng lúc với lần đọc trước
+                reminders = await self._load_reminders(
+                    datetime.now(utc), updated_since=refreshed_at - timedelta(seconds=5)
+                )
+                refreshed_at = started
+
+                changed = []
+                cancelled = []
+                for reminder in reminders:
+                    if reminder.get('cancelled'):
+                        self.engine.cancel(reminder['event_id'])
+                        cancelled.append(reminder['event_id'])
+                        continue
+                    series = self._series_from_document(reminder)
+                    current = self.engine.get(series.event_id)
+                    if current and (current.first_fire, current.cleanup_at, current.title) == \
+                            (series.first_fire, series.cleanup_at, series.title):
+                        continue
+                    changed.append(series)
+                if changed:
+                    self.engine.add_many(changed)
+                    print(f"🔄 Đã nạp {len(changed)} nhắc nhở mới từ các process/bản sao khác")
+                if cancelled:
+                    await self.bot.db_manager.delete_reminders(cancelled)
+                    print(f"🗑️ Đã hủy {len(cancelled)} nhắc nhở của sự kiện bị xóa trên Google Calendar")
+            except Exception as e:
+                print(f"❌ Lỗi khi làm mới nhắc nhở: {str(e)}")
+
+    def _build_series(self, event_id, title, event_time, minutes_before, repeat_times, guild_id=None):
+        """Tạo chuỗi nhắc nhở: nhắc từ (event_time - minutes_before), dọn dẹp sau 1 phút"""
+        reminder_time = event_time - timedelta(minutes=minutes_before)
+        cleanup_time = event_time + timedelta(minutes=1)
+        return ReminderSeries(
+            event_id,
+            title,
+            minutes_before,
+            reminder_time.timestamp(),
+            repeat_times,
+            cleanup_time.timestamp(),
+            guild_id
+        )
 
-    async def schedule_reminder(self, event_id, title, datetime_str, minutes_before=0, repeat_times=1):
+    async def schedule_reminder(self, event_id, title, datetime_str, minutes_before=0, repeat_times=1,
+                                guild_id=None):
         """Lập lịch nhắc nhở sự kiện"""
         try:
             # Chuyển datetime string sang datetime object với múi giờ VN
-            tz = timezone('Asia/Ho_Chi_Minh')
-            event_time = tz.localize(datetime.strptime(datetime_str, '%Y-%m-%d %H:%M'))
+            event_time = LOCAL_TZ.localize(datetime.strptime(datetime_str, '%Y-%m-%d %H:%M'))
             
             print(f"🕒 Lập lịch nhắc nhở cho sự kiện: {title}")
             print(f"⏰ Thời gian diễn ra: {event_time}")
-            
-            # Tính thời gian bắt đầu nhắc
-            if minutes_before > 0:
-                reminder_time = event_time - timedelta(minutes=minutes_before)
-            else:
-                reminder_time = event_time  # Nhắc ngay lúc diễn ra
-                
-            print(f"⏰ Sẽ bắt đầu nhắc từ: {reminder_time}")
-            
-            # Tạo nhiều jobs cho mỗi lần nhắc
-            for i in range(repeat_times):
-                # Thay đổi từ minutes thành seconds
-                job_time = reminder_time + timedelta(seconds=i*15)  # Mỗi 15 giây một lần
-                print(f"📅 Đặt nhắc lần {i+1} lúc: {job_time}")
-                
-                reminder_job = self.scheduler.add_job(
-                    self.send_reminder,
-                    'date',
-                    run_date=job_time,
-                    args=[event_id, title, minutes_before],
-                    id=f"{event_id}_remind_{i}",
-                    misfire_grace_time=15  # Giảm misfire_grace_time xuống 15s
-                )
-                self.reminders[f"{event_id}_remind_{i}"] = reminder_job
 
-            # Thêm job tự động xóa sau 1 phút
-            cleanup_time = event_time + timedelta(minutes=1)
-            print(f"🧹 Sẽ dọn dẹp lúc: {cleanup_time}")
-            
-            cleanup_job = self.scheduler.add_job(
-                self.cleanup_event,
-                'date',
-                run_date=cleanup_time,
-                args=[event_id, title],
-                id=f"{event_id}_cleanup",
-                misfire_grace_time=60
+            series = self._build_series(
+                event_id, title, event_time, minutes_before, repeat_times, guild_id
             )
-            self.reminders[f"{event_id}_cleanup"] = cleanup_job
+            self.engine.add(series)
+            print(f"⏰ Sẽ bắt đầu nhắc từ: {event_time - timedelta(minutes=minutes_before)} "
+                  f"({repeat_times} lần, cách nhau {REMINDER_INTERVAL_SECONDS} giây)")
+            print(f"🧹 Sẽ dọn dẹp lúc: {event_time + timedelta(minutes=1)}")
+
+            # Lưu lại để khôi phục khi bot khởi động lại
+            await self.bot.db_manager.save_reminder(self._reminder_document(series, event_time))
             
         except Exception as e:
             print(f"❌ Lỗi khi lập lịch nhắc nhở: {str(e)}")
             import traceback
             print(traceback.format_exc())
 
+    async def schedule_reminders(self, reminders, guild_id=None):
+        """Lập lịch nhắc nhở cho nhiều sự kiện cùng lúc (ví dụ khi import).
+
+        `reminders` là danh sách (event_id, title, datetime_str, minutes_before, repeat_times).
+        Engine được dựng lại heap một lần và MongoDB được ghi bằng một bulk_write.
+        Trả về False nếu lập lịch thất bại.
+        """
+        try:
+            series_list = []
+            documents = []
+            for event_id, title, datetime_str, minutes_before, repeat_times in reminders:
+                event_time = LOCAL_TZ.localize(datetime.strptime(datetime_str, '%Y-%m-%d %H:%M'))
+                series = self._build_series(
+                    event_id, title, event_time, minutes_before, repeat_times, guild_id
+                )
+                series_list.append(series)
+                documents.append(self._reminder_document(series, event_time))
+
+            self.engine.add_many(series_list)
+            await self.bot.db_manager.save_reminders(documents)
+            print(f"⏰ Đã lập lịch nhắc nhở cho {len(series_list)} sự kiện")
+            return True
+
+        except Exception as e:
+            print(f"❌ Lỗi khi lập lịch nhắc nhở hàng loạt: {str(e)}")
+            import traceback
+            print(traceback.format_exc())
+            return False
+
+    @staticmethod
+    def _reminder_document(series, event_time):
+        """Document lưu trong collection reminders (thời gian theo UTC, không kèm tzinfo)"""
+        return {
+            'event_id': series.event_id,
+            'title': series.title,
+            'event_time': event_time.astimezone(utc).replace(tzinfo=None),
+            'minutes_before': series.minutes_before,
+            'repeat_times': series.repeat_times,
+            'cleanup_at': datetime.fromtimestamp(series.cleanup_at, utc).replace(tzinfo=None),
+            'guild_id': series.guild_id,
+            'shard_key': shard_key(series.guild_id),
+            'updated_at': datetime.utcnow()
+        }
+
     async def remove_reminder(self, event_id):
-        """Xóa tất cả jobs liên quan đến một sự kiện"""
+        """Xóa toàn bộ nhắc nhở của một sự kiện"""
         try:
-            # Lấy danh sách các keys cần xóa
-            keys_to_remove = [
-                key for key in self.reminders.keys() 
-                if key.startswith(f"{event_id}_")
-            ]
-            
-            # Xóa từng job an toàn
-            for key in keys_to_remove:
-                try:
-                    if key in self.reminders:
-                        try:
-                            self.reminders[key].remove()
-                        except Exception as e:
-                            print(f"Không thể xóa job {key}: {str(e)}")
-                        finally:
-                            del self.reminders[key]
-                except Exception as e:
-                    print(f"Lỗi khi xử lý job {key}: {str(e)}")
-                    
-            print(f"✓ Đã xóa {len(keys_to_remove)} jobs cho sự kiện {event_id}")
+            removed = self.engine.cancel(event_id)
+            await self.bot.db_manager.delete_reminder(event_id)
+            if removed:
+                print(f"✓ Đã xóa nhắc nhở cho sự kiện {event_id}")
             
         except Exception as e:
             print(f"❌ Lỗi khi xóa reminders: {str(e)}")
 
-    async def send_reminder(self, event_id, title, minutes_before=0):
-        """Gửi thông báo nhắc nhở"""
+    async def apply_calendar_changes(self, events):
+        """Cập nhật nhắc nhở theo các thay đổi trên Google Calendar (từ push notification).
+
+        Webhook chỉ chạy ở process giữ shard 0, nên thay đổi được ghi vào MongoDB;
+        nhắc nhở thuộc shard khác được process sở hữu nạp lại ở lần làm mới kế tiếp.
+        """
+        events = {event['id']: event for event in events if event.get('id')}
+        if not events:
+            return
+        try:
+            reminders = await self.bot.db_manager.get_reminders(events.keys())
+        except Exception as e:
+            print(f"❌ Lỗi khi đọc nhắc nhở cho các sự kiện thay đổi: {str(e)}")
+            return
+
+        for reminder in reminders:
+            event = events[reminder['event_id']]
+            series = self._series_from_document(reminder)
+            local = self.owns(series.guild_id)
+            try:
+                if event.get('status') == 'cancelled':
+                    print(f"🗑️ Sự kiện {series.title} đã bị xóa trên Google Calendar")
+                    await self.bot.db_manager.delete_event(series.event_id)
+                    if local:
+                        await self.remove_reminder(series.event_id)
+                    else:
+                        await self.bot.db_manager.cancel_reminder(series.event_id, datetime.utcnow())
+                    continue
+
+                start = event.get('start', {}).get('dateTime')
+                if not start:
+                    continue
+                event_time = datetime.fromisoformat(start.replace('Z', '+00:00')).astimezone(LOCAL_TZ)
+                event_time = event_time.replace(second=0, microsecond=0)  # Sự kiện lưu theo phút
+                title = event.get('summary', series.title)
+                first_fire = (event_time - timedelta(minutes=series.minutes_before)).timestamp()
+                if first_fire == series.first_fire and title == series.title:
+                    continue
+
+                print(f"🔄 Sự kiện {title} đã thay đổi trên Google Calendar, lập lịch lại")
+                await self.bot.db_manager.update_event(
+                    series.event_id, title=title, datetime=event_time.strftime('%Y-%m-%d %H:%M')
+                )
+                series = self._build_series(
+                    series.event_id, title, event_time, series.minutes_before, series.repeat_times,
+                    series.guild_id
+                )
+                if local:
+                    self.engine.add(series)
+                await self.bot.db_manager.save_reminder(self._reminder_document(series, event_time))
+            except Exception as e:
+                print(f"❌ Lỗi khi cập nhật nhắc nhở cho sự kiện {event.get('id')}: {str(e)}")
+
+    async def _on_reminder(self, series, due):
+        SCHEDULER_JOBS.inc(job='reminder', status='run')
+        # Lease được claim trong worker của hàng đợi, ngay trước khi gửi
+        job = self.leases.reminder_job(series, due) if self.leases else None
+        await self.send_reminder(
+            series.event_id, series.title, series.minutes_before, due, job, series.guild_id
+        )
+
+    async def _on_cleanup(self, series):
+        if self.leases and not await self._claim(ReminderLeases.cleanup_job(series)):
+            SCHEDULER_JOBS.inc(job='cleanup', status='skipped')
+            return
+        SCHEDULER_JOBS.inc(job='cleanup', status='run')
+        self._pending_cleanups.append((series.event_id, series.title))
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.get_event_loop().create_task(self._flush_cleanups())
+
+    async def _claim(self, job):
+        """Giành quyền xử lý job qua lease, chờ và thử lại khi bản sao khác đang giữ lease"""
+        task = asyncio.current_task()
+        self._lease_waits.add(task)
+        try:
+            while True:
+                status, until = await self.leases.claim(job)
+                if status == ReminderLeases.CLAIMED:
+                    return True
+                if status != ReminderLeases.HELD:
+                    self._drop_stale(job, status)
+                    return False
+                await asyncio.sleep(max(0.0, until - time.time()) + 1)
+        finally:
+            self._lease_waits.discard(task)
+
+    def _drop_stale(self, job, status):
+        current = self.engine.get(job.event_id)
+        if status == ReminderLeases.STALE and current and current.cleanup_at == job.cleanup_at:
+            self.engine.cancel(job.event_id)  # Sự kiện đã bị xóa ở bản sao khác
+
+    async def _flush_cleanups(self):
+        # Lặp tới khi hết: sự kiện kết thúc trong lúc đang dọn lô trước được xử lý ở lô kế tiếp
+        while self._pending_cleanups:
+            await asyncio.sleep(CLEANUP_BATCH_DELAY)
+            pending, self._pending_cleanups = self._pending_cleanups, []
+            await self.cleanup_events(pending)
+
+    async def send_reminder(self, event_id, title, minutes_before=0, due=None, job=None, guild_id=None):
+        """Đưa thông báo nhắc nhở vào hàng đợi gửi (`job` là job cần lease, nếu có)"""
         try:
-            # Bỏ await vì get_event_creator không phải async
-            creator_id = self.bot.db_manager.get_event_creator(event_id)
+            creator_id = await self.bot.db_manager.get_event_creator(event_id)
             
             if not creator_id:
                 print(f"❌ Không tìm thấy người tạo sự kiện ID: {event_id}")
+                if job:
+                    await self.leases.complete(job)
                 return
-                
-            print(f"🔍 Tìm user ID: {creator_id} cho sự kiện: {title}")
-            found_user = False
-            
-            # Tìm user trong tất cả các server
-            for guild in self.bot.guilds:
-                member = guild.get_member(int(creator_id))
-                if member:
-                    found_user = True
-                    print(f"✓ Đã tìm thấy user {member.name}#{member.discriminator} trong server {guild.name}")
-                    
-                    # Tạo tin nhắn
-                    if minutes_before > 0:
-                        message = f"⚠️ Sự kiện **{title}** của bạn sẽ diễn ra sau {minutes_before} phút!"
-                    else:
-                        message = f"🔔 Sự kiện **{title}** của bạn đang diễn ra!"
-                        
-                    embed = discord.Embed(
-                        title="Nhắc nhở sự kiện!",
-                        description=message,
-                        color=discord.Color.orange()
-                    )
-                    
-                    try:
-                        # Thử gửi DM
-                        print(f"📨 Đang gửi DM cho {member.name}...")
-                        await member.send(embed=embed)
-                        print(f"✓ Đã gửi DM thành công")
-                        
-                    except discord.Forbidden as e:
-                        print(f"❌ Không thể gửi DM: {str(e)}")
-                        print("↪️ Thử gửi vào kênh general...")
-                        
-                        # Thử gửi vào kênh general
-                        channel = discord.utils.get(guild.text_channels, name='general')
-                        if channel:
-                            await channel.send(f"{member.mention}", embed=embed)
-                            print(f"✓ Đã gửi thông báo vào kênh {channel.name}")
-                        else:
-                            print("❌ Không tìm thấy kênh general")
-                            
-                    except Exception as e:
-                        print(f"❌ Lỗi không xác định khi gửi tin nhắn: {str(e)}")
-                    
-                    break
-            
-            if not found_user:
-                print(f"❌ Không tìm thấy user ID {creator_id} trong bất kỳ server nào")
+
+            if job:
+                self.dispatcher.submit(
+                    due if due is not None else time.time(),
+                    creator_id,
+                    self._deliver_leased_reminder,
+                    job,
+                    int(creator_id),
+                    title,
+                    minutes_before,
+                    guild_id
+                )
+                return
+
+            self.dispatcher.submit(
+                due if due is not None else time.time(),
+                creator_id,
+                self._deliver_reminder,
+                int(creator_id),
+                title,
+                minutes_before,
+                guild_id
+            )
                         
         except Exception as e:
             print(f"❌ Lỗi khi gửi nhắc nhở: {str(e)}")
             import traceback
             print(traceback.format_exc())
 
+    async def _deliver_reminder(self, creator_id, title, minutes_before, guild_id=None):
+        """Gửi thông báo nhắc nhở (được gọi bởi worker của hàng đợi)"""
+        # Tạo tin nhắn
+        if minutes_before > 0:
+            message = f"⚠️ Sự kiện **{title}** của bạn sẽ diễn ra sau {minutes_before} phút!"
+        else:
+            message = f"🔔 Sự kiện **{title}** của bạn đang diễn ra!"
+            
+        embed = discord.Embed(
+            title="Nhắc nhở sự kiện!",
+            description=message,
+            color=discord.Color.orange()
+        )
+
+        # Tra cứu trực tiếp nơi nhận thay vì duyệt qua mọi server
+        return await self.recipients.send(creator_id, embed, guild_id)
+
+    async def _deliver_leased_reminder(self, job, creator_id, title, minutes_before, guild_id=None):
+        """Claim lease ngay trước khi gửi, ghi nhận đã gửi để bản sao khác không gửi lại"""
+        status, until = await self.leases.claim(job)
+        if status != ReminderLeases.CLAIMED:
+            if status == ReminderLeases.HELD:
+                # Bản sao khác đang gửi: kiểm tra lại khi lease hết hạn phòng khi bản sao đó bị dừng
+                self.dispatcher.submit_later(
+                    max(0.0, until - time.time()) + 1, job.due, creator_id,
+                    self._deliver_leased_reminder, job, creator_id, title, minutes_before, guild_id
+                )
+            else:
+                self._drop_stale(job, status)
+            SCHEDULER_JOBS.inc(job='reminder', status='skipped')
+            return ReminderDispatcher.SKIPPED
+
+        try:
+            delivered = await self._deliver_reminder(creator_id, title, minutes_before, guild_id)
+        except Exception:
+            await self.leases.release(job)
+            raise
+        if delivered is False:
+            await self.leases.release(job)
+        else:
+            await self.leases.complete(job)
+        return delivered
+
     async def cleanup_event(self, event_id, title):
         """Xóa sự kiện khỏi database và Google Calendar sau khi kết thúc"""
+        await self.cleanup_events([(event_id, title)])
+
+    async def cleanup_events(self, events):
+        """Dọn dẹp nhiều sự kiện, các lần xóa trên Google Calendar được gom theo từng user"""
         try:
-            print(f"🧹 Đang dọn dẹp sự kiện: {title}")
-            
+            print(f"🧹 Đang dọn dẹp {len(events)} sự kiện: {', '.join(title for _, title in events)}")
+            creators = await self.bot.db_manager.get_event_creators(event_id for event_id, _ in events)
+
+            groups = {}
+            for event_id, title in events:
+                groups.setdefault(creators.get(event_id), []).append((event_id, title))
+
             # Xóa khỏi Google Calendar
-            calendar_success = await self.bot.calendar_manager.delete_event(event_id)
-            if calendar_success:
-                print(f"✓ Đã xóa sự kiện khỏi Google Calendar")
-            else:
-                print(f"❌ Không thể xóa sự kiện khỏi Google Calendar")
-                
-            # Xóa khỏi MongoDB
-            self.bot.db_manager.delete_event(event_id)
-            print(f"✓ Đã xóa sự kiện khỏi database")
-            
-            # Xóa jobs khỏi scheduler
-            await self.remove_reminder(event_id)
-            print(f"✓ Đã xóa các nhắc nhở còn lại")
+            for creator_id, items in groups.items():
+                if not creator_id:
+                    print(f"❌ Không tìm thấy người tạo của {len(items)} sự kiện, bỏ qua Google Calendar")
+                    continue
+                calendar_id = await self.bot.db_manager.get_user_calendar(creator_id) or 'primary'
+                results = await self.bot.calendar_manager.delete_events(
+                    [event_id for event_id, _ in items],
+                    creator_id,
+                    calendar_id=calendar_id
+                )
+                self.bot.calendar_sync.discard(
+                    creator_id,
+                    calendar_id,
+                    [event_id for (event_id, _), result in zip(items, results) if result['ok']]
+                )
+                for (event_id, title), result in zip(items, results):
+                    if result['ok']:
+                        print(f"✓ Đã xóa sự kiện {title} khỏi Google Calendar")
+                    else:
+                        print(f"❌ Không thể xóa sự kiện {title} khỏi Google Calendar: {result['error']}")
+
+            # Xóa khỏi MongoDB và scheduler
+            event_ids = [event_id for event_id, _ in events]
+            await self.bot.db_manager.delete_events(event_ids)
+            await self.bot.db_manager.delete_reminders(event_ids)
+            for event_id in event_ids:
+                self.engine.cancel(event_id)
+            print(f"✓ Đã xóa {len(event_ids)} sự kiện khỏi database và các nhắc nhở còn lại")
             
         except Exception as e:
             print(f"❌ Lỗi khi dọn dẹp sự kiện: {str(e)}")
@@ -0,0 +1,120 @@
+import asyncio
+import random
+import time
+from datetime import datetime
+
+def is_revoked(error):
+    """RefreshError có phải do refresh token bị thu hồi/hết hạn (invalid_grant) không.
+
+    Lỗi tạm thời của token endpoint (5xx, 429, internal_failure) được google-auth
+    đánh dấu retryable và không được coi là mất quyền.
+    """
+    if getattr(error, 'retryable', False):
+        return False
+    for arg in error.args:
+        if isinstance(arg, dict) and arg.get('error') == 'invalid_grant':
+            return True
+        if isinstance(arg, str) and arg.startswith('invalid_grant'):
+            return True
+    return False
+
+class TokenRefresher:
+    """Làm mới access token trong nền trước khi hết hạn.
+
+    Theo dõi credentials của các user đang hoạt động, làm mới sớm
+    `refresh_before` giây (cộng độ lệch ngẫu nhiên để không dồn cùng lúc)
+    với số lần làm mới đồng thời có giới hạn. Token bị thu hồi được phát
+    hiện ngay trong nền và báo qua `on_revoked`, không cần chờ user gõ lệnh.
+    """
+
+    def __init__(self, calendar_manager, refresh_before=300, jitter=120, concurrency=4,
+                 interval=30, active_window=24 * 3600):
+        self.calendar_manager = calendar_manager
+        self.refresh_before = refresh_before
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.interval = interval
+        self.active_window = active_window
+        self.on_revoked = None  # async callback(user_id)
+        self._tracked = {}  # user_id -> [creds, jitter, last_used]
+        self._task = None
+        self.refreshed = 0
+        self.revoked = 0
+
+    def __len__(self):
+        return len(self._tracked)
+
+    def track(self, user_id: str, creds):
+        """Ghi nhận user vừa dùng credentials"""
+        entry = self._tracked.get(user_id)
+        if entry is None or entry[0] is not creds:
+            self._tracked[user_id] = [creds, random.uniform(0, self.jitter), time.time()]
+        else:
+            entry[2] = time.time()
+
+    def untrack(self, user_id: str):
+        self._tracked.pop(user_id, None)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _due(self):
+        now = datetime.utcnow()
+        inactive_before = time.time() - self.active_window
+        due = []
+        for user_id, (creds, offset, last_used) in list(self._tracked.items()):
+            if last_used < inactive_before:
+                self.untrack(user_id)
+                continue
+            if not creds.refresh_token or not creds.expiry:
+                continue
+            if (creds.expiry - now).total_seconds() <= self.refresh_before + offset:
+                due.append((user_id, creds))
+        return due
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(user_id, creds):
+            async with semaphore:
+                await self.refresh(user_id, creds)
+
+        while True:
+            due = self._due()
+            if due:
+                await asyncio.gather(*(refresh(user_id, creds) for user_id, creds in due))
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self, user_id: str, creds):
+        """Làm mới token của một user, xử lý trường hợp token bị thu hồi"""
+        from google.auth.exceptions import RefreshError  # Import muộn: không nạp google.auth khi khởi động
+        try:
+            await self.calendar_manager.refresh_in_background(user_id, creds)
+            self.refreshed += 1
+        except RefreshError as e:
+            if not is_revoked(e):
+                # Lỗi tạm thời của Google: giữ credentials, lần quét sau sẽ thử lại
+                print(f"Lỗi khi làm mới token cho user {user_id}: {str(e)}")
+                return
+            self.revoked += 1
+            print(f"❌ Token Google của user {user_id} không còn hiệu lực: {str(e)}")
+            self.untrack(user_id)
+            await self.calendar_manager.forget_credentials(user_id)
+            if self.on_revoked:
+                try:
+                    await self.on_revoked(user_id)
+                except Exception as notify_error:
+                    print(f"Không thể thông báo cho user {user_id}: {str(notify_error)}")
+        except Exception as e:
+            # Lỗi tạm thời (mạng...), lần quét sau sẽ thử lại
+            print(f"Lỗi khi làm mới token cho user {user_id}: {str(e)}")
@@ -0,0 +1,43 @@
+"""Giả lập Google Calendar gửi push notification tới webhook của bot.
+
+Chạy: python tools/fake_push_notification.py <channel_id> [state] [url]
+- state: 'exists' (mặc định) để kích hoạt đồng bộ, 'sync' cho thông báo xác nhận
+- url: mặc định http://localhost:<WEBHOOK_PORT>/calendar/notifications
+Token được lấy từ WEBHOOK_TOKEN trong file .env.
+"""
+import asyncio
+import sys
+import uuid
+from pathlib import Path
+
+from aiohttp import ClientSession
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calendar_webhook import NOTIFICATION_PATH
+from config import WEBHOOK_PORT, WEBHOOK_TOKEN
+
+async def send_notification(url, channel_id, state='exists', token=WEBHOOK_TOKEN, message_number=1):
+    headers = {
+        'X-Goog-Channel-ID': channel_id,
+        'X-Goog-Channel-Token': token,
+        'X-Goog-Resource-ID': str(uuid.uuid4()),
+        'X-Goog-Resource-State': state,
+        'X-Goog-Message-Number': str(message_number),
+    }
+    async with ClientSession() as session:
+        async with session.post(url, headers=headers) as response:
+            return response.status
+
+async def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    channel_id = sys.argv[1]
+    state = sys.argv[2] if len(sys.argv) > 2 else 'exists'
+    url = sys.argv[3] if len(sys.argv) > 3 else f'http://localhost:{WEBHOOK_PORT}{NOTIFICATION_PATH}'
+    status = await send_notification(url, channel_id, state)
+    print(f"{state} -> {url}: HTTP {status}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
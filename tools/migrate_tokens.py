@@ -0,0 +1,38 @@
+"""Chuyển credentials từ các file tokens/token_<user_id>.pickle sang MongoDB (đã mã hóa).
+
+Chạy một lần: python tools/migrate_tokens.py [thư mục tokens]
+File đã chuyển được đổi tên thành *.pickle.migrated; chạy lại sẽ bỏ qua chúng.
+"""
+import asyncio
+import pickle
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from credential_store import CredentialStore
+from database import DatabaseManager
+
+async def migrate(token_dir):
+    db = DatabaseManager()
+    store = CredentialStore(db)
+    migrated = failed = 0
+    try:
+        for path in sorted(Path(token_dir).glob('token_*.pickle')):
+            user_id = path.stem[len('token_'):]
+            try:
+                with open(path, 'rb') as token:
+                    creds = pickle.load(token)
+                await store.save(user_id, creds)
+                path.rename(path.with_name(path.name + '.migrated'))
+                migrated += 1
+                print(f"✓ Đã chuyển credentials của user {user_id}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ Không thể chuyển {path.name}: {str(e)}")
+    finally:
+        db.close()
+    print(f"Hoàn tất: {migrated} thành công, {failed} lỗi")
+
+if __name__ == '__main__':
+    asyncio.run(migrate(sys.argv[1] if len(sys.argv) > 1 else 'tokens'))
@@ -0,0 +1,110 @@
+"""Chạy nhiều SchedulerManager trong cùng process để kiểm tra lease nhắc nhở.
+
+Chạy: python tools/simulate_replicas.py [số bản sao] [số sự kiện]
+Cần MONGODB_URI trỏ tới một MongoDB có thể ghi (ví dụ mongod chạy local hoặc
+`docker run -p 27017:27017 mongo`); dữ liệu được ghi vào database riêng
+`calendar_bot_replicas` và bị xóa khi kết thúc.
+
+Bản sao đầu tiên giả lập bị treo ở lần gửi đầu tiên mà nó giành được: lease
+của nó hết hạn và một bản sao khác phải tiếp quản. Kết quả mong đợi: mỗi lần
+nhắc được gửi đúng một lần và mỗi sự kiện được dọn dẹp đúng một lần.
+"""
+import asyncio
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import DatabaseManager
+from scheduler import SchedulerManager
+
+SIM_DB = 'calendar_bot_replicas'
+LEASE_SECONDS = 3
+REPEAT_TIMES = 2
+
+class FakeCalendarManager:
+    def __init__(self, cleaned):
+        self.cleaned = cleaned
+
+    async def delete_events(self, event_ids, user_id, calendar_id='primary'):
+        self.cleaned.update(event_ids)
+        return [{'ok': True, 'id': None, 'error': None} for _ in event_ids]
+
+async def seed(db, count, event_time):
+    await db.events.insert_many([{
+        'event_id': f'sim_{i}',
+        'title': f'Sự kiện {i}',
+        'datetime': event_time.strftime('%Y-%m-%d %H:%M'),
+        'description': 'Không có mô tả',
+        'created_by': str(100 + i)
+    } for i in range(count)])
+    await db.reminders.insert_many([{
+        'event_id': f'sim_{i}',
+        'title': f'Sự kiện {i}',
+        'event_time': event_time,
+        'minutes_before': 0,
+        'repeat_times': REPEAT_TIMES,
+        'cleanup_at': event_time + timedelta(minutes=1),
+        'updated_at': datetime.utcnow()
+    } for i in range(count)])
+
+def make_replica(db, index, deliveries, cleaned):
+    bot = SimpleNamespace(
+        db_manager=db,
+        calendar_manager=FakeCalendarManager(cleaned),
+        calendar_sync=SimpleNamespace(discard=lambda *args: None)
+    )
+    scheduler = SchedulerManager(bot, use_leases=True, lease_seconds=LEASE_SECONDS, refresh_interval=2)
+    hung = []
+
+    async def deliver(creator_id, title, minutes_before, guild_id=None):
+        if index == 0 and not hung:
+            hung.append(title)
+            await asyncio.sleep(3600)  # Giả lập bản sao bị treo khi đang giữ lease
+        deliveries[(creator_id, title)] += 1
+        return True
+
+    scheduler._deliver_reminder = deliver
+    return scheduler
+
+async def main(replicas, count):
+    db = DatabaseManager(db_name=SIM_DB)
+    deliveries = Counter()
+    cleaned = Counter()
+    try:
+        await db.client.drop_database(SIM_DB)
+        await db.ensure_schema()
+        # Sự kiện diễn ra sau vài giây, dọn dẹp sau đó 1 phút
+        await seed(db, count, datetime.utcnow().replace(microsecond=0) + timedelta(seconds=5))
+
+        schedulers = [make_replica(db, idx, deliveries, cleaned) for idx in range(replicas)]
+        await asyncio.gather(*(scheduler.start() for scheduler in schedulers))
+
+        while await db.reminders.count_documents({}) and len(cleaned) < count:
+            await asyncio.sleep(2)
+        await asyncio.sleep(LEASE_SECONDS + 2)
+
+        for scheduler in schedulers:
+            await scheduler.stop()
+
+        sent = sum(deliveries.values())
+        duplicates = sum(1 for value in deliveries.values() if value > REPEAT_TIMES)
+        print(f"Bản sao: {replicas}, sự kiện: {count}, số lần nhắc mỗi sự kiện: {REPEAT_TIMES}")
+        print(f"Số tin nhắc đã gửi: {sent} (mong đợi {count * REPEAT_TIMES})")
+        print(f"Sự kiện bị nhắc trùng: {duplicates}")
+        print(f"Sự kiện đã dọn dẹp: {len(cleaned)}, bị dọn dẹp trùng: "
+              f"{sum(1 for value in cleaned.values() if value > 1)}")
+        for idx, scheduler in enumerate(schedulers):
+            print(f"  Bản sao {idx}: claim {scheduler.leases.claimed}, nhường {scheduler.leases.skipped}")
+    finally:
+        await db.client.drop_database(SIM_DB)
+        db.close()
+
+if __name__ == '__main__':
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    ))
@@ -1,4 +1,3 @@
-from cryptography.fernet import Fernet
 import base64
 import os
 from pathlib import Path
@@ -6,10 +5,20 @@ from pathlib import Path
 class EncryptionManager:
     def __init__(self):
         self.key_file = Path(__file__).parent.parent / '.encryption_key'
-        self.key = self._load_or_create_key()
-        self.fernet = Fernet(self.key)
+        self._fernet = None
+
+    @property
+    def fernet(self):
+        # Đọc khóa và import cryptography khi mã hóa/giải mã lần đầu thay vì lúc khởi động
+        if self._fernet is None:
+            from cryptography.fernet import Fernet
+
+            self._fernet = Fernet(self._load_or_create_key())
+        return self._fernet
 
     def _load_or_create_key(self):
+        from cryptography.fernet import Fernet
+
         if self.key_file.exists():
             return self.key_file.read_bytes()
         else:
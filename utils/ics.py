@@ -0,0 +1,182 @@
+from datetime import datetime
+from pytz import timezone, utc, UnknownTimeZoneError
+
+class IcsParser:
+    """Đọc sự kiện (VEVENT) từ file iCalendar theo từng dòng.
+
+    Chỉ giữ trong bộ nhớ dòng đang đọc và sự kiện đang dựng, nên đọc được
+    file rất lớn khi dữ liệu được đưa vào dần (ví dụ từ một HTTP stream).
+    Sự kiện lặp lại chỉ lấy lần diễn ra đầu tiên, các bản ghi đè
+    (RECURRENCE-ID) và sự kiện đã hủy được bỏ qua.
+    """
+
+    def __init__(self, default_tz):
+        self.default_tz = default_tz  # Múi giờ cho thời gian không ghi TZID
+        self._line = None  # Dòng logic đang chờ các dòng nối tiếp
+        self._stack = []  # Các component đang mở (VCALENDAR, VEVENT, VALARM...)
+        self._event = None
+
+    def feed(self, line):
+        """Nhận một dòng của file, trả về danh sách sự kiện vừa đọc xong"""
+        line = line.rstrip('\r\n').lstrip('\ufeff')
+        if line[:1] in (' ', '\t'):
+            # Dòng bị gập (RFC 5545 3.1): nối vào dòng trước
+            if self._line is not None:
+                self._line += line[1:]
+            return []
+
+        previous, self._line = self._line, line
+        event = self._handle(previous) if previous else None
+        return [event] if event else []
+
+    def close(self):
+        """Xử lý dòng cuối cùng còn lại"""
+        previous, self._line = self._line, None
+        event = self._handle(previous) if previous else None
+        return [event] if event else []
+
+    @staticmethod
+    def _split(line):
+        """Tách 'NAME;PARAM=...:VALUE', bỏ qua dấu ':' nằm trong giá trị tham số có ngoặc kép"""
+        quoted = False
+        for idx, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ':' and not quoted:
+                head, value = line[:idx], line[idx + 1:]
+                break
+        else:
+            return None, {}, None
+
+        name, *raw_params = head.split(';')
+        params = {}
+        for param in raw_params:
+            key, _, param_value = param.partition('=')
+            params[key.upper()] = param_value.strip('"')
+        return name.upper(), params, value
+
+    def _handle(self, line):
+        name, params, value = self._split(line)
+        if name == 'BEGIN':
+            self._stack.append(value.upper())
+            if self._stack[-1] == 'VEVENT':
+                self._event = {}
+        elif name == 'END':
+            component = self._stack.pop() if self._stack else None
+            if component == 'VEVENT' and self._event is not None:
+                event, self._event = self._event, None
+                return self._build(event)
+        elif self._event is not None and self._stack and self._stack[-1] == 'VEVENT':
+            # Chỉ giữ thuộc tính trực tiếp của VEVENT (bỏ qua VALARM lồng bên trong)
+            self._event.setdefault(name, (params, value))
+        return None
+
+    @staticmethod
+    def _unescape(text):
+        result = []
+        chars = iter(text)
+        for char in chars:
+            if char == '\\':
+                char = next(chars, '')
+                char = '\n' if char in ('n', 'N') else char
+            result.append(char)
+        return ''.join(result)
+
+    def _parse_datetime(self, params, value):
+        """Trả về (datetime có múi giờ, có phải sự kiện cả ngày không)"""
+        value = value.strip()
+        if params.get('VALUE') == 'DATE' or len(value) == 8:
+            return self.default_tz.localize(datetime.strptime(value[:8], '%Y%m%d')), True
+
+        if value.endswith('Z'):
+            return utc.localize(datetime.strptime(value[:15], '%Y%m%dT%H%M%S')), False
+
+        tz = self.default_tz
+        if params.get('TZID'):
+            try:
+                tz = timezone(params['TZID'])
+            except UnknownTimeZoneError:
+                pass  # Tên múi giờ kiểu Windows... dùng múi giờ mặc định
+        return tz.localize(datetime.strptime(value[:15], '%Y%m%dT%H%M%S')), False
+
+    def _build(self, properties):
+        if 'DTSTART' not in properties or 'RECURRENCE-ID' in properties:
+            return None
+        if properties.get('STATUS', ({}, ''))[1].upper() == 'CANCELLED':
+            return None
+
+        try:
+            start, all_day = self._parse_datetime(*properties['DTSTART'])
+        except ValueError:
+            return None
+
+        return {
+            'uid': properties.get('UID', ({}, None))[1],
+            'summary': self._unescape(properties.get('SUMMARY', ({}, ''))[1]).strip(),
+            'description': self._unescape(properties.get('DESCRIPTION', ({}, ''))[1]).strip(),
+            'start': start,
+            'all_day': all_day
+        }
+
+async def aiter_ics_events(lines, default_tz):
+    """Duyệt sự kiện từ một async iterable các dòng (bytes hoặc str) của file .ics"""
+    parser = IcsParser(default_tz)
+    async for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        for event in parser.feed(line):
+            yield event
+    for event in parser.close():
+        yield event
+
+ICS_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//CalenderDiscordBot//Export//VI\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+)
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _fold(line):
+    """Gập dòng dài hơn 75 byte (RFC 5545 3.1), không cắt giữa ký tự UTF-8"""
+    parts = []
+    current = ''
+    size = 0
+    limit = 75
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > limit:
+            parts.append(current)
+            current, size, limit = '', 0, 74  # Dòng nối tiếp bắt đầu bằng một dấu cách
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+def _format_time(name, value):
+    if value.get('dateTime'):
+        dt = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00')).astimezone(utc)
+        return f"{name}:{dt.strftime('%Y%m%dT%H%M%SZ')}"
+    return f"{name};VALUE=DATE:{value['date'].replace('-', '')}"
+
+def format_ics_event(event, dtstamp):
+    """Chuyển một sự kiện Calendar API thành khối VEVENT"""
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{event.get('iCalUID') or event['id']}",
+        f"DTSTAMP:{dtstamp.astimezone(utc).strftime('%Y%m%dT%H%M%SZ')}",
+        _format_time('DTSTART', event['start']),
+    ]
+    if event.get('end'):
+        lines.append(_format_time('DTEND', event['end']))
+    lines.append(f"SUMMARY:{_escape(event.get('summary', ''))}")
+    if event.get('description'):
+        lines.append(f"DESCRIPTION:{_escape(event['description'])}")
+    if event.get('location'):
+        lines.append(f"LOCATION:{_escape(event['location'])}")
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
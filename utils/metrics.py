@@ -0,0 +1,153 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Ngưỡng (giây) của histogram độ trễ: từ truy vấn Mongo vài ms tới lời gọi Google chậm
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in key) + '}'
+
+class Counter:
+    """Bộ đếm chỉ tăng, tách theo nhãn"""
+
+    type = 'counter'
+
+    def __init__(self, name, help_text, lock):
+        self.name = name
+        self.help = help_text
+        self._lock = lock
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        return [(self.name, key, value) for key, value in list(self._values.items())]
+
+class Histogram:
+    """Phân bố độ trễ theo các ngưỡng cố định (kiểu Prometheus), tách theo nhãn"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, lock, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self._lock = lock
+        self.buckets = tuple(buckets)
+        self._values = {}  # nhãn -> [số lần theo từng ngưỡng..., tổng, số lần]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            idx = bisect.bisect_left(self.buckets, value)
+            if idx < len(self.buckets):  # Giá trị vượt ngưỡng cuối chỉ tính vào +Inf
+                state[idx] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        result = []
+        for key, state in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                result.append((f'{self.name}_bucket', key + (('le', repr(float(bound))),), cumulative))
+            result.append((f'{self.name}_bucket', key + (('le', '+Inf'),), state[-1]))
+            result.append((f'{self.name}_sum', key, state[-2]))
+            result.append((f'{self.name}_count', key, state[-1]))
+        return result
+
+class Collector:
+    """Giá trị đọc tại thời điểm xuất metrics (độ sâu hàng đợi, số entry cache...).
+
+    `callback()` trả về một số, hoặc danh sách (dict nhãn, giá trị).
+    """
+
+    def __init__(self, name, help_text, callback, type='gauge'):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.type = type
+
+    def samples(self):
+        value = self.callback()
+        if isinstance(value, (int, float)):
+            return [(self.name, (), value)]
+        return [(self.name, _label_key(labels), sample) for labels, sample in value]
+
+class MetricsRegistry:
+    """Tập metrics của process, xuất theo định dạng text của Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Listener của pymongo có thể được gọi từ thread khác
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} đã được đăng ký")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text, self._lock))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, self._lock, buckets))
+
+    def collector(self, name, help_text, callback, type='gauge'):
+        """Đăng ký (hoặc thay) giá trị đọc qua callback"""
+        self._metrics[name] = Collector(name, help_text, callback, type)
+        return self._metrics[name]
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"❌ Lỗi khi đọc metric {metric.name}: {str(e)}")
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, key, value in samples:
+                lines.append(f'{name}{_format_labels(key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+@contextmanager
+def observe(counter, histogram, **labels):
+    """Đếm lời gọi theo kết quả (ok/error) và ghi thời gian chạy vào histogram"""
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        yield
+        status = 'ok'
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+        counter.inc(status=status, **labels)
+
+REGISTRY = MetricsRegistry()
+
+COMMANDS = REGISTRY.counter('bot_commands_total', 'Số lệnh đã chạy theo lệnh và kết quả')
+COMMAND_SECONDS = REGISTRY.histogram('bot_command_seconds', 'Thời gian xử lý lệnh')
+CALENDAR_REQUESTS = REGISTRY.counter(
+    'calendar_api_requests_total', 'Số lời gọi Google Calendar API theo method và kết quả'
+)
+CALENDAR_SECONDS = REGISTRY.histogram('calendar_api_seconds', 'Thời gian lời gọi Google Calendar API')
+MONGO_COMMANDS = REGISTRY.counter('mongo_commands_total', 'Số lệnh MongoDB theo loại và kết quả')
+MONGO_SECONDS = REGISTRY.histogram('mongo_command_seconds', 'Thời gian lệnh MongoDB')
+SCHEDULER_JOBS = REGISTRY.counter('scheduler_jobs_total', 'Số job nhắc nhở/dọn dẹp đã chạy theo kết quả')
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """Token bucket bất đồng bộ: tối đa `rate` lần trong mỗi `per` giây"""
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.capacity = rate
+        self.fill_rate = rate / per
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Lấy một token nếu có sẵn (trả về 0), nếu không thì không lấy và trả về số giây cần chờ"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.fill_rate
+
+    def reserve(self):
+        """Đặt trước một token, trả về số giây phải chờ trước khi được dùng nó"""
+        self._refill()
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.fill_rate)
+
+    async def acquire(self):
+        """Chờ đến khi lấy được một token.
+
+        Token được đặt trước (không có await giữa lúc tính và lúc trừ) rồi mới ngủ,
+        nên các coroutine khác vẫn dùng được bucket trong lúc chờ và được phục vụ
+        theo thứ tự gọi.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)